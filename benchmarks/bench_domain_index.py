@@ -0,0 +1,96 @@
+"""Per-URL cost of the domain-category lookup as the domain map grows.
+
+Compares the compiled DomainIndex with the original linear substring scan over
+DEFAULT_DOMAIN_MAP and checks that both give the same answer for every URL. The
+last column times the whole row-wise categorize_domain_from_url with the map
+installed as DEFAULT_DOMAIN_MAP, so per-call overhead that grows with the map
+(such as checking it for edits) shows up too.
+
+    python benchmarks/bench_domain_index.py
+"""
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from domain_index import DomainIndex
+from sessionization import Sessionization
+
+MAP_SIZES = (50, 1_000, 10_000, 100_000)
+N_DOMAINS = 5_000
+LINEAR_MAX_SIZE = 10_000   # the linear scan gets too slow to time beyond this
+TLDS = ("com", "org", "net", "io", "co.uk", "edu", "gov", "in")
+CATEGORIES = ("Education/Career", "Social/Entertainment", "Shopping", "Finance", "Travel")
+
+
+def random_domain(rng):
+    label = "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 12)))
+    return f"{label}.{rng.choice(TLDS)}"
+
+
+def build_map(size, rng):
+    domain_map = dict(Sessionization.DEFAULT_DOMAIN_MAP)
+    while len(domain_map) < size:
+        domain_map[random_domain(rng)] = rng.choice(CATEGORIES)
+    return dict(list(domain_map.items())[:size])
+
+
+def sample_domains(domain_map, rng):
+    keys = list(domain_map)
+    doms = []
+    for _ in range(N_DOMAINS):
+        r = rng.random()
+        if r < 0.5:
+            doms.append(rng.choice(("", "docs.", "shop.", "login.")) + rng.choice(keys))
+        else:
+            doms.append(random_domain(rng))
+    return doms
+
+
+def linear_lookup(domain_map, dom):
+    for known_domain, cat in domain_map.items():
+        if known_domain in dom:
+            return cat
+    return None
+
+
+def main():
+    rng = random.Random(7)
+    print(f"{'map size':>10} {'build (ms)':>11} {'index (us/url)':>15} {'linear (us/url)':>16} {'row-wise (us/url)':>18}")
+    original_map = Sessionization.DEFAULT_DOMAIN_MAP
+    for size in MAP_SIZES:
+        domain_map = build_map(size, rng)
+        doms = sample_domains(domain_map, rng)
+
+        t0 = time.perf_counter()
+        index = DomainIndex(domain_map)
+        build_ms = (time.perf_counter() - t0) * 1e3
+
+        t0 = time.perf_counter()
+        got = [index.lookup(d) for d in doms]
+        index_us = (time.perf_counter() - t0) / len(doms) * 1e6
+
+        linear_us = float("nan")
+        if size <= LINEAR_MAX_SIZE:
+            t0 = time.perf_counter()
+            expected = [linear_lookup(domain_map, d) for d in doms]
+            linear_us = (time.perf_counter() - t0) / len(doms) * 1e6
+            assert got == expected, "DomainIndex disagrees with the linear scan"
+
+        urls = [f"https://{d}/page?id=1" for d in doms]
+        Sessionization.DEFAULT_DOMAIN_MAP = domain_map
+        Sessionization.get_domain_index()   # build outside the timed loop
+        t0 = time.perf_counter()
+        for url in urls:
+            Sessionization.categorize_domain_from_url(url)
+        rowwise_us = (time.perf_counter() - t0) / len(urls) * 1e6
+        Sessionization.DEFAULT_DOMAIN_MAP = original_map
+
+        print(f"{size:>10} {build_ms:>11.1f} {index_us:>15.2f} {linear_us:>16.2f} {rowwise_us:>18.2f}")
+
+
+if __name__ == "__main__":
+    main()
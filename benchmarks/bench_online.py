@@ -0,0 +1,144 @@
+"""Latency and throughput of the online sessionizer, in process and over the local endpoint.
+
+    python benchmarks/bench_online.py --visits 200000 --users 50 --clients 8
+    python benchmarks/bench_online.py --visits 200000 --model          # also score predicted intent
+    python benchmarks/bench_online.py --visits 200000 --map-size 100000   # large DEFAULT_DOMAIN_MAP
+
+Visits come from synthetic.generate_history, merged across users in arrival
+(time) order. The in-process run times every OnlineSessionizer.add call; the
+endpoint run starts online_sessionization.serve on a free local port and
+replays the same visits from `--clients` concurrent asyncio connections (users
+are split across clients, so each user's visits stay in order). Reports
+p50/p95/p99/max latency in microseconds and visits per second for both, plus
+the micro-batch path (add_many) at `--batch-size`. `--map-size` grows
+DEFAULT_DOMAIN_MAP with random domains first, so per-visit costs that depend on
+the size of the rules show up.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import numpy as np
+import pandas as pd
+from online_sessionization import OnlineSessionizer, serve
+from synthetic import generate_history
+from bench_domain_index import build_map
+
+
+def live_visits(n_visits, n_users, seed=0):
+    per_user = max(1, n_visits // n_users)
+    df = pd.concat(
+        [generate_history(per_user, f"user_{i}", seed=seed + i).assign(user=f"user_{i}") for i in range(n_users)],
+        ignore_index=True,
+    )
+    df["visit_time"] = pd.to_datetime(df["visit_time"])
+    return df.sort_values("visit_time", kind="stable").reset_index(drop=True)[["user", "url", "visit_time"]]
+
+
+def train_model(visits):
+    from sessionization import Sessionization
+    from model_training import IntentModel
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        history = visits.sort_values(["user", "visit_time"], kind="stable").reset_index(drop=True)
+        session_df = Sessionization.sessionization(history, lists=True)
+        return IntentModel().fit(session_df, epochs=1)
+
+
+def report(name, latencies_s, wall_s, n):
+    us = np.asarray(latencies_s) * 1e6
+    p50, p95, p99 = np.percentile(us, [50, 95, 99])
+    print(f"{name:<22} {p50:>9.0f} {p95:>9.0f} {p99:>9.0f} {us.max():>10.0f} {n / wall_s:>12,.0f}")
+
+
+def bench_in_process(visits, model):
+    sessionizer = OnlineSessionizer(model=model)
+    rows = list(zip(visits["user"], visits["url"], visits["visit_time"]))
+    latencies = []
+    t0 = time.perf_counter()
+    for user, url, visit_time in rows:
+        t = time.perf_counter()
+        sessionizer.add(user, url, visit_time)
+        latencies.append(time.perf_counter() - t)
+    report("add (in process)", latencies, time.perf_counter() - t0, len(rows))
+
+
+def bench_micro_batches(visits, model, batch_size):
+    sessionizer = OnlineSessionizer(model=model)
+    latencies = []
+    t0 = time.perf_counter()
+    for start in range(0, len(visits), batch_size):
+        batch = visits.iloc[start:start + batch_size]
+        t = time.perf_counter()
+        sessionizer.add_many(batch)
+        latencies.append((time.perf_counter() - t) / len(batch))
+    report(f"add_many ({batch_size}/batch)", latencies, time.perf_counter() - t0, len(visits))
+
+
+async def bench_endpoint(visits, model, n_clients):
+    server = await serve(OnlineSessionizer(model=model), "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    shards = [part for _, part in visits.groupby(visits["user"].map(hash) % n_clients, sort=False)]
+
+    async def client(part):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        latencies = []
+        for user, url, visit_time in zip(part["user"], part["url"], part["visit_time"]):
+            line = json.dumps({"user": user, "url": url, "visit_time": visit_time.isoformat()}) + "\n"
+            t = time.perf_counter()
+            writer.write(line.encode("utf-8"))
+            answer = await reader.readline()
+            latencies.append(time.perf_counter() - t)
+            if b'"error"' in answer:
+                raise RuntimeError(answer.decode())
+        writer.close()
+        await writer.wait_closed()
+        return latencies
+
+    async with server:
+        t0 = time.perf_counter()
+        results = await asyncio.gather(*(client(part) for part in shards))
+        wall = time.perf_counter() - t0
+    report(f"endpoint ({n_clients} clients)", [x for r in results for x in r], wall, len(visits))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--visits", type=int, default=200_000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--model", action="store_true", help="train an IntentModel first and predict per visit")
+    parser.add_argument("--map-size", type=int, default=0, help="grow DEFAULT_DOMAIN_MAP to this many entries")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from sessionization import Sessionization
+    if args.map_size:
+        Sessionization.DEFAULT_DOMAIN_MAP = build_map(args.map_size, random.Random(args.seed))
+    visits = live_visits(args.visits, args.users, args.seed)
+    model = train_model(visits) if args.model else None
+    print(f"{len(visits):,} visits, {args.users} users, model={'yes' if model is not None else 'no'}, "
+          f"{len(Sessionization.DEFAULT_DOMAIN_MAP):,} map entries")
+    print(f"{'path':<22} {'p50 us':>9} {'p95 us':>9} {'p99 us':>9} {'max us':>10} {'visits/s':>12}")
+    # Every run starts from a cold label cache, so the first visit of each URL pays for labeling
+    for run in (lambda: bench_in_process(visits, model),
+                lambda: bench_micro_batches(visits, model, args.batch_size),
+                lambda: asyncio.run(bench_endpoint(visits, model, args.clients))):
+        Sessionization._url_cache.clear()
+        Sessionization._domain_cache.clear()
+        run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Scaling of ParallelPipeline with the number of worker processes.
+
+    python benchmarks/bench_parallel.py --users 200 --visits 20000
+
+Speedup is measured against workers=1 and the session tables of every run are
+checked to be identical.
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+from parallel_pipeline import ParallelPipeline
+from synthetic import write_user_files
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--visits", type=int, default=20_000, help="visits per user")
+    parser.add_argument("--workers", type=int, nargs="*", default=None,
+                        help="worker counts to time (default: 1, 2, 4, ... up to the core count)")
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    counts = args.workers or sorted({1, *[w for w in (2, 4, 8, 12, 16) if w <= cores], cores})
+
+    with tempfile.TemporaryDirectory(prefix="bench_parallel_") as tmp:
+        files = write_user_files(tmp, args.users, args.visits)
+        rows = args.users * args.visits
+        print(f"{args.users} users x {args.visits} visits = {rows:,} rows on {cores} cores")
+        print(f"{'workers':>8} {'seconds':>9} {'rows/s':>12} {'speedup':>8}")
+
+        baseline = reference = None
+        for workers in counts:
+            with contextlib.redirect_stdout(io.StringIO()):
+                t0 = time.perf_counter()
+                session_df = ParallelPipeline.run(files, workers=workers)
+                elapsed = time.perf_counter() - t0
+            if reference is None:
+                baseline, reference = elapsed, session_df
+            else:
+                pd.testing.assert_frame_equal(session_df, reference)
+            print(f"{workers:>8} {elapsed:>9.2f} {rows / elapsed:>12,.0f} {baseline / elapsed:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
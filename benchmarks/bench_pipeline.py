@@ -0,0 +1,315 @@
+"""Stage-by-stage throughput and memory of the pipeline on synthetic histories.
+
+    python benchmarks/bench_pipeline.py --rows 10000 100000 1000000 --users 10
+    python benchmarks/bench_pipeline.py --rows 1000000 --compare benchmarks/results/pipeline-20250101-120000.json
+
+Histories come from synthetic.generate_history (Zipfian domains, search URLs,
+bursty timelines) and are written as one CSV per user before timing. Every size
+runs in a fresh process, so its peak RSS and cold label caches are not affected
+by earlier sizes. For each stage the harness reports seconds, rows/s and RSS
+after the stage; results (with machine, versions and git commit) are saved as
+JSON under benchmarks/results/ so runs can be compared over time.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, HERE)
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # not available on Windows; peak RSS is then reported as None
+    resource = None
+
+RESULTS_DIR = os.path.join(HERE, "results")
+DEFAULT_ROWS = (10_000, 100_000, 1_000_000)
+ROWWISE_LIMIT = 200_000   # distinct URLs timed through the row-wise helpers
+
+
+# -----------------------------
+# Memory probes
+# -----------------------------
+def current_rss():
+    """Resident set size in bytes (Linux /proc), or None."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss():
+    """Peak resident set size of this process in bytes, or None."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024   # Linux reports KiB
+
+
+# -----------------------------
+# Stages: each takes the shared state dict and returns the number of rows it processed
+# -----------------------------
+def stage_load(state):
+    from data_collection import CSV_DTYPES
+    state["frames"] = {user: pd.read_csv(path, dtype=CSV_DTYPES) for user, path in state["files"].items()}
+    return sum(len(df) for df in state["frames"].values())
+
+
+def stage_parse_time(state):
+    from data_collection import VISIT_TIME_FORMAT
+    for df in state["frames"].values():
+        df["visit_time"] = pd.to_datetime(df["visit_time"], format=VISIT_TIME_FORMAT)
+    return sum(len(df) for df in state["frames"].values())
+
+
+def stage_prep_domain(state):
+    from data_collection import DataCollection
+    for user, df in state["frames"].items():
+        DataCollection.prep_frame(df, user)
+    return sum(len(df) for df in state["frames"].values())
+
+
+def stage_sort(state):
+    df = pd.concat(state.pop("frames").values(), ignore_index=True)
+    state["df"] = df.sort_values(["user", "visit_time"]).reset_index(drop=True)
+    return len(state["df"])
+
+
+def stage_assign_sessions(state):
+    from sessionization import Sessionization
+    Sessionization.assign_sessions(state["df"])
+    return len(state["df"])
+
+
+def _distinct_urls(state):
+    urls = pd.unique(state["df"]["url"].dropna())
+    return urls[:ROWWISE_LIMIT]
+
+
+def stage_normalize_domain(state):
+    from sessionization import Sessionization
+    urls = _distinct_urls(state)
+    for url in urls:
+        Sessionization._normalize_domain_or_none(url)
+    return len(urls)
+
+
+def stage_categorize_rowwise(state):
+    from sessionization import Sessionization
+    urls = _distinct_urls(state)
+    for url in urls:
+        Sessionization.categorize_domain_from_url(url)
+    return len(urls)
+
+
+def stage_categorize(state):
+    from sessionization import Sessionization
+    Sessionization.label_visits(state["df"])   # cold caches: fresh process
+    return len(state["df"])
+
+
+def stage_categorize_cached(state):
+    from sessionization import Sessionization
+    Sessionization.label_visits(state["df"])
+    return len(state["df"])
+
+
+def stage_groupby_aggregate(state):
+    df = state["df"]
+    state["grouped"] = df.groupby(["user", "session_id"], observed=True, sort=True).agg(
+        session_start=("visit_time", "min"),
+        session_end=("visit_time", "max"),
+        num_visits=("url", "count"),
+        unique_domains=("domain", "nunique"),
+    )
+    return len(df)
+
+
+def stage_aggregate_sessions(state):
+    from sessionization import Sessionization
+    state["sessions"] = Sessionization.aggregate_sessions(state["df"])
+    return len(state["df"])
+
+
+STAGES = (
+    ("load", stage_load),
+    ("parse_time", stage_parse_time),
+    ("prep_domain", stage_prep_domain),
+    ("sort", stage_sort),
+    ("assign_sessions", stage_assign_sessions),
+    ("normalize_domain", stage_normalize_domain),
+    ("categorize_rowwise", stage_categorize_rowwise),
+    ("categorize", stage_categorize),
+    ("categorize_cached", stage_categorize_cached),
+    ("groupby_aggregate", stage_groupby_aggregate),
+    ("aggregate_sessions", stage_aggregate_sessions),
+)
+
+
+def run_size(task):
+    """Run every selected stage on one set of user files (called in a fresh process)."""
+    files, selected = task
+    import data_collection, sessionization  # noqa: F401  (keep import time out of the first stage)
+    state = {"files": files}
+    results = []
+    for name, stage in STAGES:
+        t0 = time.perf_counter()
+        rows = stage(state)
+        elapsed = time.perf_counter() - t0
+        if name in selected:
+            results.append({
+                "stage": name, "rows": rows, "seconds": elapsed,
+                "rows_per_s": rows / elapsed if elapsed > 0 else None,
+                "rss_bytes": current_rss(),
+            })
+    by_stage = {r["stage"]: r for r in results}
+    if "groupby_aggregate" in by_stage and "aggregate_sessions" in by_stage:
+        # dominant category + proportions = full aggregation minus the plain groupby
+        seconds = max(by_stage["aggregate_sessions"]["seconds"] - by_stage["groupby_aggregate"]["seconds"], 0.0)
+        rows = by_stage["aggregate_sessions"]["rows"]
+        results.append({"stage": "proportions", "rows": rows, "seconds": seconds,
+                        "rows_per_s": rows / seconds if seconds > 0 else None, "rss_bytes": None})
+    return {"stages": results, "peak_rss_bytes": peak_rss(), "sessions": len(state.get("sessions", []))}
+
+
+# -----------------------------
+# Reporting
+# -----------------------------
+def machine_info():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": pd.Timestamp.now().isoformat(timespec="seconds"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def results_frame(results):
+    rows = []
+    for run in results:
+        for stage in run["stages"]:
+            rows.append({"input_rows": run["rows"], "users": run["users"], "peak_rss_mb": _mb(run["peak_rss_bytes"]),
+                         **stage, "rss_mb": _mb(stage["rss_bytes"])})
+    return pd.DataFrame(rows)
+
+
+def _mb(n):
+    return None if n is None else n / 2**20
+
+
+def print_table(frame):
+    for rows, part in frame.groupby("input_rows", sort=True):
+        peak = part["peak_rss_mb"].iat[0]
+        print(f"\n{rows:,} rows ({part['users'].iat[0]} users), peak RSS "
+              f"{'n/a' if peak is None or pd.isna(peak) else f'{peak:,.0f} MiB'}")
+        print(f"{'stage':<20} {'rows':>10} {'seconds':>9} {'rows/s':>13} {'RSS MiB':>9}")
+        for _, r in part.iterrows():
+            rate = "" if pd.isna(r["rows_per_s"]) else f"{r['rows_per_s']:,.0f}"
+            rss = "" if pd.isna(r["rss_mb"]) else f"{r['rss_mb']:,.0f}"
+            print(f"{r['stage']:<20} {r['rows']:>10,} {r['seconds']:>9.3f} {rate:>13} {rss:>9}")
+
+
+def print_comparison(frame, baseline_path):
+    with open(baseline_path) as f:
+        baseline = results_frame(json.load(f)["results"])
+    merged = frame.merge(baseline, on=["input_rows", "stage"], suffixes=("", "_base"))
+    if merged.empty:
+        print(f"\nNo matching sizes/stages in {baseline_path}.")
+        return
+    print(f"\nSpeedup vs {baseline_path} (>1 = faster now)")
+    print(f"{'rows':>10} {'stage':<20} {'base s':>9} {'now s':>9} {'speedup':>8}")
+    for _, r in merged.iterrows():
+        speedup = r["seconds_base"] / r["seconds"] if r["seconds"] > 0 else float("nan")
+        print(f"{r['input_rows']:>10,} {r['stage']:<20} {r['seconds_base']:>9.3f} {r['seconds']:>9.3f} {speedup:>8.2f}")
+
+
+def plot_scaling(frame, path):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(9, 5))
+    for stage, part in frame.dropna(subset=["rows_per_s"]).groupby("stage", sort=False):
+        ax.plot(part["input_rows"], part["rows_per_s"], marker="o", label=stage)
+    ax.set_xscale("log")
+    ax.set_yscale("log")
+    ax.set_xlabel("Input rows")
+    ax.set_ylabel("Rows / second")
+    ax.set_title("Pipeline stage throughput")
+    ax.legend(fontsize=8, bbox_to_anchor=(1.02, 1), loc="upper left")
+    fig.tight_layout()
+    fig.savefig(path, dpi=120)
+    plt.close(fig)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=list(DEFAULT_ROWS),
+                        help="total visits per run (10k to 50M); one run per value")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--domains", type=int, default=50_000, help="size of the Zipfian domain vocabulary")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stages", nargs="+", choices=[name for name, _ in STAGES],
+                        default=[name for name, _ in STAGES], help="stages to report (all stages still run)")
+    parser.add_argument("--output", help="JSON results path (default: benchmarks/results/pipeline-<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier results JSON to print speedups against")
+    parser.add_argument("--plot", help="save a rows/s scaling curve to this PNG")
+    args = parser.parse_args()
+
+    from synthetic import generate_history, write_user_files
+
+    def generator(n, user_label, seed):
+        return generate_history(n, user_label, seed=seed, n_domains=args.domains)
+
+    info = machine_info()
+    results = []
+    ctx = multiprocessing.get_context("spawn")
+    for rows in sorted(args.rows):
+        users = max(1, min(args.users, rows))
+        with tempfile.TemporaryDirectory(prefix="bench_pipeline_") as tmp:
+            files = write_user_files(tmp, users, rows // users, seed=args.seed, generator=generator)
+            with ctx.Pool(1) as pool:
+                run = pool.apply(run_size, ((files, set(args.stages)),))
+        results.append({"rows": (rows // users) * users, "users": users, **run})
+        print(f"✅ {results[-1]['rows']:,} rows done")
+
+    frame = results_frame(results)
+    print_table(frame)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"pipeline-{pd.Timestamp.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({"machine": info, "args": vars(args), "results": results}, f, indent=2)
+    print(f"\nResults saved to {output}")
+
+    if args.compare:
+        print_comparison(frame, args.compare)
+    if args.plot:
+        plot_scaling(frame, args.plot)
+        print(f"Scaling curve saved to {args.plot}")
+
+
+if __name__ == "__main__":
+    main()
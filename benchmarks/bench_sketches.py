@@ -0,0 +1,106 @@
+"""Accuracy, memory and mergeability of domain_sketches against exact pandas results.
+
+    python benchmarks/bench_sketches.py --visits 2000000 --domains 200000
+
+Domains follow a Zipf distribution. Reports top-20 recall and count error,
+HyperLogLog relative error per user / day / session, and checks that merging
+per-shard sketches gives the same state as one sketch over all visits. Exits
+non-zero if an error bound is violated.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+from domain_sketches import DomainStats
+
+
+def zipf_visits(n_visits, n_domains, n_users, s=1.1, seed=0, days=30):
+    rng = np.random.default_rng(seed)
+    weights = 1.0 / np.arange(1, n_domains + 1) ** s
+    domain_ids = rng.choice(n_domains, n_visits, p=weights / weights.sum())
+    domains = pd.Series([f"site{i}.com" for i in range(n_domains)], dtype=object).to_numpy()[domain_ids]
+    users = np.array([f"user_{i + 1}" for i in range(n_users)], dtype=object)[rng.integers(0, n_users, n_visits)]
+    visit_time = pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, days * 86_400, n_visits), unit="s")
+    df = pd.DataFrame({"user": users, "visit_time": visit_time, "domain": domains})
+    df["session_id"] = df["user"] + "_hour_" + df["visit_time"].dt.strftime("%Y%m%d%H")
+    return df
+
+
+def relative_errors(estimate, exact):
+    estimate = estimate.reindex(exact.index)
+    return ((estimate - exact).abs() / exact).to_numpy()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--visits", type=int, default=2_000_000)
+    parser.add_argument("--domains", type=int, default=200_000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--chunks", type=int, default=8, help="shards merged for the mergeability check")
+    args = parser.parse_args()
+
+    df = zipf_visits(args.visits, args.domains, args.users)
+    failures = []
+
+    t0 = time.perf_counter()
+    stats = DomainStats().update(df)
+    elapsed = time.perf_counter() - t0
+    print(f"{len(df):,} visits, {df['domain'].nunique():,} distinct domains; sketch update {elapsed:.2f}s")
+
+    # ---- heavy hitters ----
+    exact_top = df["domain"].value_counts().head(20)
+    approx_top = stats.top_domains(20)
+    recall = len(set(exact_top.index) & set(approx_top.index)) / len(exact_top)
+    bound = stats.frequencies.epsilon * stats.frequencies.total
+    over = (approx_top - df["domain"].value_counts().reindex(approx_top.index)).max()
+    print(f"top-20 recall {recall:.2f}; max overcount {over} (Count-Min bound {bound:.0f})")
+    if recall < 1.0 or over > bound:
+        failures.append("top domains")
+
+    # ---- distinct domains ----
+    for level, key in (("user", df["user"]), ("day", df["visit_time"].dt.strftime("%Y-%m-%d")),
+                       ("session", df["session_id"])):
+        exact = df.groupby(key)["domain"].nunique()
+        errors = relative_errors(stats.distinct_domains(level), exact)
+        sketch = {"user": stats.per_user, "day": stats.per_day, "session": stats.per_session}[level]
+        std_error = 1.04 / np.sqrt(2 ** sketch.precision)
+        print(f"distinct per {level:<8} keys {len(exact):>7,}  median rel. error {np.median(errors):.4f}  "
+              f"p95 {np.percentile(errors, 95):.4f}  (std. error {std_error:.4f})")
+        if np.median(errors) > 2 * std_error:
+            failures.append(f"distinct per {level}")
+
+    # ---- mergeability ----
+    bounds = np.linspace(0, len(df), args.chunks + 1).astype(int)
+    shards = [DomainStats().update(df.iloc[a:b]) for a, b in zip(bounds[:-1], bounds[1:])]
+    merged = shards[0]
+    for shard in shards[1:]:
+        merged.merge(shard)
+    same = (
+        np.array_equal(merged.frequencies.table, stats.frequencies.table)
+        and np.array_equal(merged.per_user.counts().sort_index(), stats.per_user.counts().sort_index())
+        and set(merged.top_domains(20).index) == set(approx_top.index)
+    )
+    print(f"merge of {args.chunks} shards matches the single sketch: {same}")
+    if not same:
+        failures.append("merge")
+
+    # ---- memory ----
+    sketch_bytes = (stats.frequencies.table.nbytes + stats.per_user.registers.nbytes
+                    + stats.per_day.registers.nbytes + stats.per_session.registers.nbytes
+                    + int(stats.heavy.counts.memory_usage(deep=True)) * 2)
+    exact_bytes = int(df["domain"].value_counts().memory_usage(deep=True))
+    exact_bytes += int(df.groupby(["session_id", "domain"]).size().memory_usage(deep=True))
+    print(f"sketch state {sketch_bytes / 2**20:.1f} MiB vs exact tables {exact_bytes / 2**20:.1f} MiB")
+
+    if failures:
+        print("FAILED:", ", ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
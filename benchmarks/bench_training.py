@@ -0,0 +1,82 @@
+"""Feature extraction and out-of-core intent-model training at scale.
+
+    python benchmarks/bench_training.py --sessions 100000 1000000 --batch-size 100000
+
+Session tables are synthesized directly (Zipfian domains, skewed categories,
+proportions, counts, durations) so millions of sessions can be timed without
+running the visit pipeline. For each size the harness reports seconds and
+rows/s of the features and fit stages, the largest sparse batch, and RSS, which
+should stay flat as the number of sessions grows.
+"""
+import argparse
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import numpy as np
+import pandas as pd
+import instrumentation
+from feature_extraction import known_categories
+from model_training import IntentModel
+from synthetic import zipf_domains
+
+
+def synthetic_sessions(n_sessions, n_users=100, n_domains=50_000, seed=0):
+    """Session table shaped like sessionization(df, lists=True)."""
+    rng = np.random.default_rng(seed)
+    categories = known_categories()
+    cat_weights = 1.0 / np.arange(1, len(categories) + 1)
+    dominant = rng.choice(len(categories), n_sessions, p=cat_weights / cat_weights.sum())
+    props = rng.dirichlet(np.ones(len(categories)) * 0.3, n_sessions)
+    props[np.arange(n_sessions), dominant] += 1
+    props /= props.sum(axis=1, keepdims=True)
+
+    domains = zipf_domains(n_domains)
+    weights = 1.0 / np.arange(1, n_domains + 1) ** 1.1
+    n_unique = rng.integers(1, 8, n_sessions)
+    domain_ids = rng.choice(n_domains, n_unique.sum(), p=weights / weights.sum())
+    domains_list = np.split(domains[domain_ids], np.cumsum(n_unique)[:-1])
+
+    start = pd.Timestamp("2025-01-01") + pd.to_timedelta(np.sort(rng.integers(0, 365 * 86_400, n_sessions)), unit="s")
+    num_visits = n_unique + rng.poisson(5, n_sessions)
+    span = rng.exponential(15, n_sessions)
+    session_df = pd.DataFrame({
+        "user": np.array([f"user_{i}" for i in range(n_users)], dtype=object)[rng.integers(0, n_users, n_sessions)],
+        "session_start": start,
+        "num_visits": num_visits,
+        "unique_domains": n_unique,
+        "domains_list": [list(d) for d in domains_list],
+        "duration_minutes_observed": span,
+        "duration_minutes": np.maximum(span, 60.0),
+        "dominant_category": np.asarray(categories, dtype=object)[dominant],
+    })
+    return pd.concat([session_df, pd.DataFrame(props, columns=categories)], axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--batch-size", type=int, default=100_000)
+    parser.add_argument("--epochs", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'sessions':>10} {'stage':<9} {'seconds':>9} {'rows/s':>12} {'max batch MiB':>14} {'RSS MiB':>9}")
+    for n in args.sessions:
+        session_df = synthetic_sessions(n, seed=args.seed)
+        with instrumentation.instrumented() as sink:
+            model = IntentModel().fit(session_df, epochs=args.epochs, batch_size=args.batch_size)
+        summary = sink.summary()
+        rss = model.report["rss_after_bytes"]
+        for name in ("features", "fit"):
+            r = summary.loc[name]
+            print(f"{n:>10,} {name:<9} {r['seconds']:>9.2f} {r['rows_per_s']:>12,.0f} "
+                  f"{model.report['max_batch_bytes'] / 2**20:>14.1f} "
+                  f"{'n/a' if rss is None else f'{rss / 2**20:,.0f}':>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""URL parsing cost: one shared cached parse (url_parts) vs the original urlparse/parse_qs per consumer.
+
+    python benchmarks/bench_url_parsing.py --visits 500000 --domains 50000
+
+The original code parsed a visit up to four times: urlparse for the raw domain
+column, again in normalize_domain (after prefixing "http://" when there is no
+scheme), again for the path/query tokens in categorize_domain_from_url, and once
+more with a full parse_qs in extract_search_query_from_url. The legacy versions
+are reproduced below. Each consumer runs over the same visits (Zipfian
+synthetic history plus malformed URLs) with both implementations. The outputs
+must match exactly, and the script exits non-zero otherwise.
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from urllib.parse import urlparse, parse_qs
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import numpy as np
+import pandas as pd
+import url_parts
+from data_collection import DataCollection
+from sessionization import Sessionization
+from synthetic import generate_history
+
+ODD_URLS = (
+    None, "", "  ", "about:blank", "chrome://settings", "example.com/path?q=x", " https://www.google.com/search?q=edu ",
+    "http://[::1", "http://x.com/\ttab", "https://www.google.com/search?q=&q=a+b&q=c%20d", "https://www.bing.com/search?%71=x",
+    "https://search.yahoo.com/search;p=1?p=stock+price&x", "https://www.google.com/maps/place/Paris", "foo?x=http://bar",
+)
+
+
+# -----------------------------
+# Original implementations (one urlparse per consumer, full parse_qs)
+# -----------------------------
+def legacy_netloc(x):
+    try:
+        return urlparse(str(x)).netloc if pd.notnull(x) else None
+    except ValueError:   # the original aborted the whole load here; the shared parse gives None
+        return None
+
+
+def legacy_extract_search_query(url):
+    try:
+        parsed = urlparse(url or "")
+        netloc = (parsed.netloc or "").lower()
+        if any(s in netloc for s in Sessionization.SEARCH_ENGINES):
+            qs = parse_qs(parsed.query)
+            for k in ("q", "query", "p", "search"):
+                if k in qs and qs[k]:
+                    return " ".join(qs[k]).lower()
+            return parsed.path.replace("/", " ").lower().strip()
+    except Exception:
+        pass
+    return None
+
+
+def legacy_normalize_domain(url_or_domain):
+    try:
+        p = urlparse(url_or_domain if "://" in url_or_domain else "http://" + url_or_domain)
+        dom = p.netloc.lower()
+        if dom.startswith("www."):
+            dom = dom[4:]
+        return dom.split(":")[0]
+    except Exception:
+        return (url_or_domain or "").lower()
+
+
+def legacy_normalize_or_none(url):
+    try:
+        return legacy_normalize_domain(url)
+    except Exception:
+        return None
+
+
+def legacy_categorize(url):
+    if pd.isna(url) or str(url).strip() == "":
+        return "Miscellaneous"
+    url = str(url).strip()
+    dom = legacy_normalize_domain(url)
+    dom_clean = re.sub(Sessionization.SUBDOMAIN_PREFIX, "", dom)
+    cat = Sessionization.get_domain_index().lookup(dom_clean)
+    if cat is not None:
+        return cat
+    if any(se in dom_clean for se in Sessionization.SEARCH_ENGINES):
+        query_text = legacy_extract_search_query(url)
+        if query_text:
+            cat = Sessionization.get_keyword_matcher().match(query_text.lower())
+            return cat if cat is not None else "General Search"
+        return "General Search"
+    parsed = urlparse(url)
+    combined = " ".join(filter(None, [dom_clean, parsed.path.replace("/", " "), parsed.query])).lower()
+    cat = Sessionization.get_keyword_matcher().match(combined)
+    if cat is not None:
+        return cat
+    return Sessionization.sld_category(dom_clean)
+
+
+# -----------------------------
+# Consumers: (name, legacy over the URL column, current over the URL column)
+# -----------------------------
+def _rowwise(fn):
+    def run(urls):
+        out = []
+        for url in urls:
+            try:
+                out.append(fn(url))
+            except Exception as e:
+                out.append(type(e).__name__)
+        return out
+    return run
+
+
+CONSUMERS = (
+    ("raw domain column", lambda urls: [legacy_netloc(u) for u in urls],
+     lambda urls: list(url_parts.netlocs(urls))),
+    ("normalize_domain", _rowwise(legacy_normalize_or_none), _rowwise(Sessionization._normalize_domain_or_none)),
+    ("search query", _rowwise(legacy_extract_search_query), _rowwise(Sessionization.extract_search_query_from_url)),
+    ("categorize row-wise", _rowwise(legacy_categorize), _rowwise(Sessionization.categorize_domain_from_url)),
+)
+
+
+def visit_urls(n_visits, n_domains, seed):
+    df = generate_history(n_visits, "user_1", seed=seed, n_domains=n_domains)
+    urls = df["url"].astype(object).tolist()
+    rng = np.random.default_rng(seed)
+    for i in rng.choice(len(urls), min(len(urls), 50 * len(ODD_URLS)), replace=False):
+        urls[i] = ODD_URLS[i % len(ODD_URLS)]
+    return urls
+
+
+def clear_parse_caches():
+    url_parts._cache.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--visits", type=int, default=200_000)
+    parser.add_argument("--domains", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    urls = visit_urls(args.visits, args.domains, args.seed)
+    print(f"{len(urls):,} visits, {len(set(u for u in urls if isinstance(u, str))):,} distinct URLs")
+    print(f"{'consumer':<22} {'legacy s':>9} {'shared s':>9} {'speedup':>8}  equal")
+
+    ok = True
+    legacy_total = shared_total = 0.0
+    clear_parse_caches()
+    for name, legacy, shared in CONSUMERS:
+        t0 = time.perf_counter()
+        expected = legacy(urls)
+        legacy_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        got = shared(urls)
+        shared_s = time.perf_counter() - t0
+        same = expected == got
+        ok &= same
+        legacy_total += legacy_s
+        shared_total += shared_s
+        print(f"{name:<22} {legacy_s:>9.3f} {shared_s:>9.3f} {legacy_s / shared_s:>8.2f}  {same}")
+    print(f"{'all consumers':<22} {legacy_total:>9.3f} {shared_total:>9.3f} {legacy_total / shared_total:>8.2f}")
+
+    # End to end: domain column + vectorized labeling, cold caches (well-formed history only:
+    # like the original, labeling raises on URLs urlparse rejects)
+    frame = generate_history(args.visits, "user_1", seed=args.seed, n_domains=args.domains)
+    clear_parse_caches()
+    Sessionization._url_cache.clear()
+    Sessionization._domain_cache.clear()
+    t0 = time.perf_counter()
+    DataCollection.prep_frame(frame, "user_1")
+    Sessionization.label_visits(frame)
+    print(f"prep + label_visits (shared parse, cold caches): {time.perf_counter() - t0:.3f}s for "
+          f"{len(frame):,} visits, {url_parts.cache_stats()['misses']:,} URL parses")
+
+    if not ok:
+        print("❌ Outputs differ from the original implementation.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
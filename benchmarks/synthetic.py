@@ -0,0 +1,116 @@
+"""Seeded synthetic browsing histories for the benchmarks."""
+import os
+import numpy as np
+import pandas as pd
+
+DOMAINS = (
+    "www.google.com", "www.youtube.com", "en.wikipedia.org", "www.amazon.com", "mail.google.com",
+    "www.reddit.com", "github.com", "stackoverflow.com", "www.linkedin.com", "www.netflix.com",
+    "docs.python.org", "www.booking.com", "www.chase.com", "news.ycombinator.com", "www.bing.com",
+)
+PATHS = ("/", "/search", "/watch", "/wiki/Python", "/r/python", "/dp/B00X", "/jobs/view", "/questions/1")
+QUERIES = ("", "q=python+tutorial", "q=cheap+flights", "q=music+video", "v=abc123", "q=bank+loan")
+
+
+def generate_user(n_visits, user_label, seed=0, start="2025-01-01", days=90):
+    """One user's visits: url, title, visit_time (unsorted, like the Chrome export)."""
+    rng = np.random.default_rng(seed)
+    domains = rng.choice(DOMAINS, n_visits)
+    paths = rng.choice(PATHS, n_visits)
+    queries = rng.choice(QUERIES, n_visits)
+    urls = [f"https://{d}{p}" + (f"?{q}" if q else "") for d, p, q in zip(domains, paths, queries)]
+    offsets = rng.integers(0, days * 86_400, n_visits)
+    visit_time = pd.Timestamp(start) + pd.to_timedelta(offsets, unit="s")
+    return pd.DataFrame({"url": urls, "title": user_label, "visit_time": visit_time})
+
+
+# -----------------------------
+# Realistic histories: Zipfian domains, search URLs, bursty timelines
+# -----------------------------
+# Search engines with the query parameter each one uses
+SEARCH_URLS = (
+    ("https://www.google.com/search", "q"), ("https://www.bing.com/search", "q"),
+    ("https://search.yahoo.com/search", "p"), ("https://duckduckgo.com/", "q"),
+    ("https://www.google.co.in/search", "q"), ("https://search.aol.com/aol/search", "query"),
+)
+SEARCH_TERMS = (
+    "python", "tutorial", "course", "university", "music", "video", "movie", "buy", "price", "discount",
+    "bank", "loan", "stock", "tax", "flight", "hotel", "train", "weather", "news", "recipe", "near",
+    "me", "best", "cheap", "how", "to", "2025", "review", "login", "map",
+)
+SITE_PATHS = (
+    "/", "/index.html", "/about", "/products/item-42", "/blog/2025/01/post", "/watch", "/search",
+    "/account/settings", "/cart", "/course/intro", "/news/world", "/help", "/static/app.js",
+)
+SITE_TLDS = ("com", "org", "net", "io", "co.uk", "edu", "in", "gov")
+SITE_PREFIXES = ("www.", "", "m.", "app.", "en.", "mail.", "blog.")
+
+
+def zipf_domains(n_domains, seed=0):
+    """Domain vocabulary ordered by popularity: the known DOMAINS first, then generated sites."""
+    rng = np.random.default_rng(seed)
+    prefixes = rng.choice(SITE_PREFIXES, n_domains)
+    tlds = rng.choice(SITE_TLDS, n_domains)
+    generated = [f"{p}site{i}.{t}" for i, (p, t) in enumerate(zip(prefixes, tlds))]
+    return np.array((list(DOMAINS) + generated)[:n_domains], dtype=object)
+
+
+def generate_history(n_visits, user_label, seed=0, start="2025-01-01", days=90, n_domains=10_000,
+                     zipf_s=1.1, search_share=0.15, burst_size=12, in_burst_gap_s=45):
+    """Realistic visits for one user: url, title, visit_time, newest first like the Chrome export.
+
+    Domains follow a Zipf(zipf_s) law over `n_domains` sites, `search_share` of the
+    visits are search-engine URLs with q/query/p parameters, and visits come in
+    bursts (geometric size, exponential gaps inside a burst) whose start times
+    favour waking hours.
+    """
+    rng = np.random.default_rng(seed)
+    domains = zipf_domains(n_domains, seed=0)
+    ranks = np.arange(1, len(domains) + 1, dtype=float)
+    weights = ranks ** -zipf_s
+    domain_ids = rng.choice(len(domains), n_visits, p=weights / weights.sum())
+
+    # ---- URLs ----
+    urls = ("https://" + pd.Series(domains[domain_ids]) + pd.Series(rng.choice(SITE_PATHS, n_visits))).to_numpy()
+    is_search = rng.random(n_visits) < search_share
+    n_search = int(is_search.sum())
+    if n_search:
+        engines = rng.integers(0, len(SEARCH_URLS), n_search)
+        bases = np.array([f"{base}?{param}=" for base, param in SEARCH_URLS], dtype=object)[engines]
+        n_terms = rng.integers(1, 4, n_search)
+        terms = rng.choice(SEARCH_TERMS, (n_search, 3))
+        query = pd.Series(terms[:, 0], dtype=object)
+        for k in (1, 2):
+            query = query.where(n_terms <= k, query + "+" + terms[:, k])
+        urls[is_search] = (pd.Series(bases) + query).to_numpy()
+    titles = np.where(is_search, "Search", pd.Series(domains[domain_ids]).str.replace("www.", "", regex=False))
+
+    # ---- bursty timeline ----
+    n_bursts = max(1, int(np.ceil(n_visits / burst_size)))
+    day = rng.integers(0, days, n_bursts)
+    hour_weights = np.array([1, 1, 1, 1, 1, 1, 2, 4, 6, 7, 7, 7, 6, 7, 7, 7, 7, 7, 8, 9, 9, 8, 5, 3], dtype=float)
+    hour = rng.choice(24, n_bursts, p=hour_weights / hour_weights.sum())
+    burst_start = day * 86_400 + hour * 3_600 + rng.integers(0, 3_600, n_bursts)
+    burst = np.sort(rng.integers(0, n_bursts, n_visits))
+    first_of_burst = np.r_[True, burst[1:] != burst[:-1]]
+    gaps = np.where(first_of_burst, 0.0, rng.exponential(in_burst_gap_s, n_visits))
+    # cumulative gap inside each burst
+    cumulative = np.cumsum(gaps)
+    offsets = cumulative - np.maximum.accumulate(np.where(first_of_burst, cumulative, 0.0))
+    seconds = burst_start[burst] + offsets
+    visit_time = pd.Timestamp(start) + pd.to_timedelta(np.round(seconds * 1e6).astype(np.int64), unit="us")
+
+    df = pd.DataFrame({"url": urls, "title": titles, "visit_time": visit_time})
+    return df.sort_values("visit_time", ascending=False, kind="stable").reset_index(drop=True)
+
+
+def write_user_files(out_dir, n_users, visits_per_user, seed=0, generator=generate_user):
+    """Write n_users CSVs into out_dir and return a user_files-style mapping."""
+    os.makedirs(out_dir, exist_ok=True)
+    files = {}
+    for i in range(n_users):
+        user_label = f"user_{i + 1}"
+        path = os.path.join(out_dir, f"{user_label}.csv")
+        generator(visits_per_user, user_label, seed=seed + i).to_csv(path, index=False)
+        files[user_label] = path
+    return files
@@ -1,36 +1,18 @@
-import sqlite3
-import pandas as pd
 import os
-import datetime
-import shutil
+from browser_history import ChromeHistorySource
 
 data_path = os.path.expanduser(
     r"~\AppData\Local\Google\Chrome\User Data\Default\History"
 )
 
-temp_path = "chrome_history_temp"
-shutil.copy2(data_path, temp_path)
+# Read the History DB in place, read-only (mode=ro, no temp copy).
+# Chrome locks the database while running; immutable_fallback=True then reads it
+# with immutable=1, which skips the lock and the write-ahead log: the newest
+# visits may be missing and rows written during the read may be inconsistent.
+# Close Chrome first for an exact export.
+source = ChromeHistorySource(data_path, immutable_fallback=True)
 
-
-conn = sqlite3.connect(temp_path)
-cursor = conn.cursor()
-
-
-query = """
-SELECT 
-    urls.url, 
-    urls.title, 
-    visits.visit_time
-FROM urls, visits
-WHERE urls.id = visits.url
-ORDER BY visits.visit_time DESC;
-"""
-
-df = pd.read_sql_query(query, conn)
-
-def chrome_time_to_datetime(chrome_time):
-    return datetime.datetime(1601, 1, 1) + datetime.timedelta(microseconds=chrome_time)
-
-df["visit_time"] = df["visit_time"].apply(chrome_time_to_datetime)
+# Full export; for nightly refreshes use DataCollection.sync_browser(source, user_label)
+# with a watermark_file so only new visits are read.
+df = source.read_all().iloc[::-1]  # newest first, as before
 df.to_csv('User_browser_data.csv')
-conn.close()
\ No newline at end of file
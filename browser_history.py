@@ -0,0 +1,181 @@
+import os
+import json
+import sqlite3
+from urllib.parse import quote
+import numpy as np
+import pandas as pd
+
+# -----------------------------
+# Direct, incremental ingestion from browser history databases
+# -----------------------------
+CHROME_EPOCH_OFFSET_US = 11_644_473_600 * 1_000_000   # 1601-01-01 -> 1970-01-01, microseconds
+SAFARI_EPOCH_OFFSET_S = 978_307_200                    # 1970-01-01 -> 2001-01-01, seconds
+DEFAULT_BATCH_SIZE = 50_000
+
+
+class BrowserHistorySource:
+    """Read visits straight from a browser's SQLite history, newer than a watermark.
+
+    The database is opened read-only through a ``file:...?mode=ro`` URI and
+    queried in place; the file is never copied. The single SELECT runs in one
+    read transaction, so it sees a consistent state even while the browser
+    writes. snapshot=True copies the whole database into memory with the SQLite
+    backup API first (costly on large profiles; only an incremental sync's new
+    rows are read otherwise). Rows are fetched in `batch_size` batches with
+    ``WHERE visit_time > ?``, and raw epochs are converted in one vectorized
+    step per batch.
+
+    immutable_fallback=True retries with ``immutable=1`` when the database is
+    locked (a running browser may hold an exclusive lock). SQLite then assumes
+    the file cannot change: it takes no locks and ignores the write-ahead log, so
+    recent visits still in the WAL are missed, and a write by the browser during
+    the read can return inconsistent rows or a "malformed" error. Use it only
+    when closing the browser is not an option.
+    """
+
+    name = None
+    QUERY = None
+
+    def __init__(self, db_path, watermark_file=None, batch_size=DEFAULT_BATCH_SIZE,
+                 snapshot=False, immutable_fallback=False):
+        self.db_path = os.path.expanduser(db_path)
+        self.watermark_file = watermark_file
+        self.batch_size = batch_size
+        self.snapshot = snapshot
+        self.immutable_fallback = immutable_fallback
+
+    # ---- timestamps ----
+    @staticmethod
+    def to_datetime(raw):
+        raise NotImplementedError
+
+    # ---- connection ----
+    def connect(self):
+        try:
+            return self._open(immutable=False)
+        except sqlite3.OperationalError as e:
+            if not self.immutable_fallback or "locked" not in str(e):
+                raise
+            return self._open(immutable=True)
+
+    def _open(self, immutable):
+        uri = f"file:{quote(self.db_path)}?mode=ro"
+        if immutable:
+            uri += "&immutable=1"
+        conn = sqlite3.connect(uri, uri=True)
+        try:
+            # take the read lock now: a locked file fails here (backup() would retry forever)
+            conn.execute("SELECT count(*) FROM sqlite_master").fetchone()
+            if not self.snapshot:
+                return conn
+            copy = sqlite3.connect(":memory:")
+            conn.backup(copy)
+        except Exception:
+            conn.close()
+            raise
+        conn.close()
+        return copy
+
+    # ---- watermark ----
+    def _watermark_key(self):
+        return f"{self.name}:{self.db_path}"
+
+    def load_watermark(self):
+        """Raw browser timestamp of the newest visit already ingested (None = never synced)."""
+        if not self.watermark_file or not os.path.exists(self.watermark_file):
+            return None
+        with open(self.watermark_file) as f:
+            return json.load(f).get(self._watermark_key())
+
+    def save_watermark(self, raw_value):
+        if not self.watermark_file:
+            return
+        marks = {}
+        if os.path.exists(self.watermark_file):
+            with open(self.watermark_file) as f:
+                marks = json.load(f)
+        marks[self._watermark_key()] = raw_value
+        tmp = self.watermark_file + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(marks, f, indent=2)
+        os.replace(tmp, self.watermark_file)
+
+    # ---- reading ----
+    def iter_batches(self, since=None):
+        """Yield (frame, last_raw_time) batches of visits with raw visit_time > since, oldest first.
+
+        Without a watermark every visit with a set timestamp (raw > 0) is read.
+        """
+        since = 0 if since is None else since
+        conn = self.connect()
+        try:
+            cursor = conn.execute(self.QUERY, (since,))
+            while True:
+                rows = cursor.fetchmany(self.batch_size)
+                if not rows:
+                    break
+                batch = pd.DataFrame.from_records(rows, columns=["url", "title", "visit_time"])
+                last_raw = rows[-1][2]
+                batch["visit_time"] = self.to_datetime(batch["visit_time"].to_numpy())
+                yield batch, last_raw
+        finally:
+            conn.close()
+
+    def read_all(self):
+        """Every visit in the database as one typed frame (no watermark involved)."""
+        frames = [batch for batch, _ in self.iter_batches()]
+        if not frames:
+            return pd.DataFrame({"url": [], "title": [], "visit_time": pd.to_datetime([])})
+        return pd.concat(frames, ignore_index=True)
+
+    def sync(self, handle):
+        """Pass every visit newer than the stored watermark to `handle(frame)`, batch by batch.
+
+        The watermark is advanced after each handled batch, so an interrupted sync
+        resumes where it stopped. Returns the number of visits handed over.
+        """
+        total = 0
+        for batch, last_raw in self.iter_batches(self.load_watermark()):
+            handle(batch)
+            self.save_watermark(last_raw)
+            total += len(batch)
+        return total
+
+
+class ChromeHistorySource(BrowserHistorySource):
+    """Chrome/Chromium `History` database (visit_time = microseconds since 1601-01-01 UTC)."""
+
+    name = "chrome"
+    QUERY = """
+    SELECT urls.url, urls.title, visits.visit_time
+    FROM visits
+    JOIN urls ON urls.id = visits.url
+    WHERE visits.visit_time > ?
+    ORDER BY visits.visit_time
+    """
+
+    @staticmethod
+    def to_datetime(raw):
+        raw = np.asarray(raw, dtype="int64")  # µs since 1601 exceed float64 precision
+        times = (raw - CHROME_EPOCH_OFFSET_US).astype("datetime64[us]")
+        times[raw <= 0] = np.datetime64("NaT")  # unset timestamps
+        return times.astype("datetime64[ns]")
+
+
+class SafariHistorySource(BrowserHistorySource):
+    """Safari `History.db` (visit_time = seconds since 2001-01-01 UTC)."""
+
+    name = "safari"
+    QUERY = """
+    SELECT history_items.url, history_items.title, history_visits.visit_time
+    FROM history_visits
+    JOIN history_items ON history_items.id = history_visits.history_item
+    WHERE history_visits.visit_time > ?
+    ORDER BY history_visits.visit_time
+    """
+
+    @staticmethod
+    def to_datetime(raw):
+        raw = np.asarray(raw, dtype="float64")
+        raw[raw == 0] = np.nan  # unset timestamps
+        return pd.to_datetime(raw + SAFARI_EPOCH_OFFSET_S, unit="s")
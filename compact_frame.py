@@ -0,0 +1,85 @@
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  (enables the "string[pyarrow]" dtype)
+    STRING_DTYPE = "string[pyarrow]"
+except ImportError:  # optional dependency; without it text columns stay Python objects
+    STRING_DTYPE = None
+
+# -----------------------------
+# Compact in-memory representation of the visits frame
+# -----------------------------
+# Low-cardinality columns become categoricals backed by per-run dictionaries: frames
+# encoded with the same dictionaries (e.g. the chunks of one run) give a value the
+# same code in every frame, and the dictionaries are dropped with the run instead of
+# growing for the life of the process. Free text (url, title) goes to Arrow string arrays. Sessions are keyed by an int64 (see session_engine.session_keys) and
+# session_id strings are only formatted for the session table.
+CATEGORICAL_COLUMNS = ("user", "domain", "category")
+TEXT_COLUMNS = ("url", "title")
+
+
+class CategoryDictionary:
+    """Append-only category list: a value keeps its code once it has been seen."""
+
+    def __init__(self, values=()):
+        self.categories = pd.Index(list(dict.fromkeys(values)), dtype=object)
+
+    def encode(self, values):
+        """`values` as a Categorical over these categories (growing them if needed)."""
+        values = pd.Series(values)
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            if not len(self.categories):   # already compact: adopt its categories as they are
+                self.categories = values.cat.categories.astype(object)
+            if values.cat.categories.equals(self.categories):
+                return values.array
+        uniques = pd.Index(values.dropna().unique()).astype(object)
+        new = uniques[~uniques.isin(self.categories)]
+        if len(new):
+            self.categories = self.categories.append(new)
+        return pd.Categorical(values.astype(object), categories=self.categories)
+
+
+def new_dictionaries():
+    """One empty CategoryDictionary per categorical column, to share across the frames of a run."""
+    return {col: CategoryDictionary() for col in CATEGORICAL_COLUMNS}
+
+
+def compact_visits(df, dictionaries=None):
+    """Convert the visit columns of `df` to their compact dtypes, in place.
+
+    user/domain/category become categoricals over `dictionaries` (from
+    new_dictionaries(); default: fresh ones for this frame). Pass the same
+    dictionaries for frames that must share codes. url/title become Arrow strings
+    when pyarrow is installed. Missing columns are skipped, so this can run before
+    and after labeling.
+    """
+    dictionaries = dictionaries if dictionaries is not None else new_dictionaries()
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = dictionaries[col].encode(df[col])
+    if STRING_DTYPE is not None:
+        for col in TEXT_COLUMNS:
+            if col in df.columns and df[col].dtype != STRING_DTYPE:
+                df[col] = df[col].astype(STRING_DTYPE)
+    return df
+
+
+def memory_report(before, after=None):
+    """Bytes per column (deep) of `before`, and of `after` with the saving when given.
+
+    Columns present in only one frame (e.g. session_id vs session_key) show 0 bytes
+    on the other side.
+    """
+    def usage(df):
+        return pd.DataFrame({"dtype": df.dtypes.astype(str), "bytes": df.memory_usage(index=False, deep=True)})
+
+    report = usage(before)
+    if after is not None:
+        report = report.join(usage(after).add_prefix("compact_"), how="outer")
+        report = report.reindex([*before.columns, *[c for c in after.columns if c not in before.columns]])
+        report[["bytes", "compact_bytes"]] = report[["bytes", "compact_bytes"]].fillna(0).astype("int64")
+    report.loc["total", "bytes"] = report["bytes"].sum()
+    if after is not None:
+        report.loc["total", "compact_bytes"] = report["compact_bytes"].sum()
+        report["ratio"] = report["bytes"] / report["compact_bytes"]
+    return report
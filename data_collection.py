@@ -1,13 +1,11 @@
+import os
+import tempfile
 import pandas as pd
 import numpy as np
-from urllib.parse import urlparse
-from collections import Counter
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import LabelEncoder, StandardScaler
-from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import classification_report, confusion_matrix
+from visit_store import VisitStore
+from compact_frame import compact_visits
+from instrumentation import stage
+from url_parts import netlocs
 import warnings
 warnings.filterwarnings("ignore")
 
@@ -20,31 +18,245 @@ user_files = {
     # add more: "user_3": "./user3.csv", ...
 }
 
+# -----------------------------
+# CONFIG: streaming ingestion
+# -----------------------------
+CHUNK_SIZE = 200_000              # rows per chunk handed to Sessionization
+VISIT_TIME_FORMAT = "ISO8601"     # the extractors write ISO timestamps
+CSV_COLUMNS = ("url", "title", "visit_time")
+CSV_DTYPES = {"url": "object", "title": "object", "visit_time": "object"}
+MERGE_FAN_IN = 16                 # sorted runs merged at once during the external sort
+
+# -----------------------------
+# CONFIG: columnar store (optional)
+# -----------------------------
+VISIT_STORE_DIR = None            # e.g. "./visit_store"; when set, final_data() reads Parquet instead of CSV
+
 # -----------------------------
 # Helper: load and normalize data
 # -----------------------------
 
 class DataCollection:
     def load_and_prep(path, user_label):
-        df = pd.read_csv(path)
+        with stage("read_csv", user=user_label) as s:
+            df = pd.read_csv(path)
+            s.set(rows=len(df))
         # Ensure visit_time exists and parse
         if 'visit_time' not in df.columns:
             raise ValueError(f"File {path} lacks 'visit_time' column.")
         df = df.copy()
-        df['visit_time'] = pd.to_datetime(df['visit_time'])
-        df['user'] = user_label
-        # extract domain safely
-        df['domain'] = df['url'].apply(lambda x: urlparse(str(x)).netloc if pd.notnull(x) else None)
+        with stage("parse_time", rows=len(df)):
+            df['visit_time'] = pd.to_datetime(df['visit_time'])
+        return DataCollection.prep_frame(df, user_label)
+
+    def prep_frame(df, user_label):
+        """Attach the user label and raw domain to a frame whose visit_time is already parsed."""
+        with stage("prep_domain", rows=len(df)):
+            df['user'] = user_label
+            # extract domain safely (each distinct URL parsed once, shared with labeling)
+            df['domain'] = netlocs(df['url'])
         return df
 
 # -----------------------------
 # Load all users
 # -----------------------------
-    def final_data():
+    def final_data(columns=None, users=None, start=None, end=None, store=None, compact=False):
+        """All visits sorted by user and visit_time.
+
+        Reads the Parquet store when one is given or VISIT_STORE_DIR is configured and
+        holds raw visits (only the requested columns, users and [start, end) range are
+        loaded); otherwise parses the CSVs in user_files. With compact=True the frame
+        uses the compact_frame dtypes (categoricals and Arrow strings).
+        """
+        store = store or DataCollection.open_store()
+        if store is not None and store.exists("raw_visits"):
+            with stage("store_read") as s:
+                df = store.read("raw_visits", columns=columns, users=users, start=start, end=end)
+                s.set(rows=len(df))
+            return compact_visits(df) if compact else df
+
         dfs = []
         for user_label, path in user_files.items():
+            if users is not None and user_label not in users:
+                continue
             dfs.append(DataCollection.load_and_prep(path, user_label))
-        df = pd.concat(dfs, ignore_index=True)
-        df = df.sort_values(['user', 'visit_time']).reset_index(drop=True)
-        return df
-    
+        with stage("concat_sort") as s:
+            df = pd.concat(dfs, ignore_index=True)
+            df = df.sort_values(['user', 'visit_time']).reset_index(drop=True)
+            s.set(rows=len(df))
+        if start is not None:
+            df = df[df['visit_time'] >= pd.Timestamp(start)]
+        if end is not None:
+            df = df[df['visit_time'] < pd.Timestamp(end)]
+        if columns is not None:
+            df = df[list(columns)]
+        df = df.reset_index(drop=True)
+        return compact_visits(df) if compact else df
+
+# -----------------------------
+# Columnar store
+# -----------------------------
+    def open_store():
+        """VisitStore at VISIT_STORE_DIR, or None when the store is not configured."""
+        return VisitStore(VISIT_STORE_DIR) if VISIT_STORE_DIR else None
+
+    def ingest_to_store(store=None, chunksize=CHUNK_SIZE):
+        """Convert every CSV in user_files into the raw_visits table, one chunk at a time."""
+        store = store or DataCollection.open_store()
+        if store is None:
+            raise ValueError("No store given and VISIT_STORE_DIR is not set.")
+        store.drop_users("raw_visits", user_files)
+        for chunk in DataCollection.stream_data(chunksize=chunksize):
+            store.write("raw_visits", chunk, append=True)
+        return store
+
+# -----------------------------
+# Direct browser-history sync (see browser_history.py)
+# -----------------------------
+    def sync_browser(source, user_label, store=None):
+        """Pull visits newer than the source's watermark straight from the browser database.
+
+        Each batch is prepped like a CSV load and, when a store is given, appended to its
+        raw_visits table before the watermark moves on. Returns the new visits.
+        """
+        frames = []
+
+        def handle(batch):
+            batch = DataCollection.prep_frame(batch, user_label)
+            if store is not None:
+                store.write("raw_visits", batch, append=True)
+            frames.append(batch)
+
+        source.sync(handle)
+        if not frames:
+            return pd.DataFrame(columns=["url", "title", "visit_time", "user", "domain"])
+        return pd.concat(frames, ignore_index=True)
+
+# -----------------------------
+# Streaming: typed, sorted chunks with bounded memory
+# -----------------------------
+    def prep_chunk(chunk, user_label, users):
+        """Type one raw CSV chunk: fixed-format visit_time, categorical user, domain."""
+        if 'visit_time' not in chunk.columns:
+            raise ValueError(f"Chunk for {user_label} lacks 'visit_time' column.")
+        with stage("prep_chunk", rows=len(chunk), user=user_label):
+            chunk['visit_time'] = pd.to_datetime(chunk['visit_time'], format=VISIT_TIME_FORMAT)
+            # rows without a timestamp never land in a session
+            if chunk['visit_time'].isna().any():
+                chunk = chunk[chunk['visit_time'].notna()].copy()
+            chunk['user'] = pd.Categorical.from_codes(
+                np.full(len(chunk), users.index(user_label), dtype=np.int32), categories=users
+            )
+            chunk['domain'] = netlocs(chunk['url'])
+        return chunk
+
+    def iter_user_chunks(path, user_label, chunksize=CHUNK_SIZE, users=None, tmp_dir=None):
+        """Yield one user's visits as typed chunks sorted by visit_time.
+
+        The CSV is read `chunksize` rows at a time. A file that fits in one chunk is
+        sorted in memory; otherwise each chunk is sorted and spilled as a run under
+        `tmp_dir`, and the runs are k-way merged back in chunks of `chunksize` rows.
+        """
+        users = list(users) if users is not None else [user_label]
+        reader = pd.read_csv(
+            path,
+            usecols=lambda c: c in CSV_COLUMNS,
+            dtype=CSV_DTYPES,
+            chunksize=chunksize,
+        )
+        with tempfile.TemporaryDirectory(dir=tmp_dir, prefix="visits_sort_") as run_dir:
+            runs = []
+            pending = None
+            for raw in reader:
+                chunk = DataCollection.prep_chunk(raw, user_label, users)
+                chunk = chunk.sort_values('visit_time', kind='stable')
+                if pending is None and not runs:
+                    pending = chunk
+                    continue
+                if pending is not None:
+                    runs.append(_write_run([pending], run_dir, len(runs), chunksize))
+                    pending = None
+                runs.append(_write_run([chunk], run_dir, len(runs), chunksize))
+
+            if pending is not None:
+                if len(pending):
+                    yield pending.reset_index(drop=True)
+                return
+
+            # Multi-pass merge keeps at most MERGE_FAN_IN run buffers in memory
+            while len(runs) > MERGE_FAN_IN:
+                merged = []
+                for i in range(0, len(runs), MERGE_FAN_IN):
+                    group = runs[i:i + MERGE_FAN_IN]
+                    merged.append(_write_run(_merge_runs(group, chunksize), run_dir, f"m{len(runs)}_{i}", chunksize))
+                runs = merged
+            yield from _merge_runs(runs, chunksize)
+
+    def stream_data(chunksize=CHUNK_SIZE, tmp_dir=None):
+        """Streaming counterpart of final_data(): chunks ordered by user, then visit_time.
+
+        `user` is categorical over all configured users so chunks concatenate cleanly.
+        Peak memory is a few chunks, independent of total history size.
+        """
+        users = sorted(user_files)
+        for user_label in users:
+            yield from DataCollection.iter_user_chunks(
+                user_files[user_label], user_label, chunksize=chunksize, users=users, tmp_dir=tmp_dir
+            )
+
+
+def _write_run(frames, run_dir, run_name, chunksize):
+    """Spill sorted frames as a run of small pickle pieces; returns the piece paths."""
+    piece_rows = max(1, chunksize // MERGE_FAN_IN)
+    paths = []
+    for frame in frames:
+        for start in range(0, len(frame), piece_rows):
+            piece_path = os.path.join(run_dir, f"run{run_name}_{len(paths)}.pkl")
+            frame.iloc[start:start + piece_rows].to_pickle(piece_path)
+            paths.append(piece_path)
+    return paths
+
+
+def _read_run(paths):
+    """Load a run back one piece at a time, deleting each piece once read."""
+    for piece_path in paths:
+        piece = pd.read_pickle(piece_path)
+        os.remove(piece_path)
+        yield piece
+
+
+def _merge_runs(runs, chunksize):
+    """K-way merge of runs sorted by visit_time, yielding chunks of `chunksize` rows.
+
+    Every step emits all buffered rows up to the smallest "last timestamp" among the
+    run buffers; those rows can no longer be preceded by anything still on disk.
+    """
+    readers = [_read_run(run) for run in runs]
+    heads = [next(reader, None) for reader in readers]
+    out = []
+    out_rows = 0
+    while True:
+        live = [i for i, head in enumerate(heads) if head is not None]
+        if not live:
+            break
+        bound = min(heads[i]['visit_time'].iat[-1] for i in live)
+        parts = []
+        for i in live:
+            head = heads[i]
+            n = int(head['visit_time'].searchsorted(bound, side='right'))
+            if n:
+                parts.append(head.iloc[:n])
+            heads[i] = head.iloc[n:] if n < len(head) else next(readers[i], None)
+        merged = pd.concat(parts).sort_values('visit_time', kind='stable')
+        out.append(merged)
+        out_rows += len(merged)
+        if out_rows >= chunksize:
+            buffer = pd.concat(out, ignore_index=True)
+            cut = (len(buffer) // chunksize) * chunksize
+            for start in range(0, cut, chunksize):
+                yield buffer.iloc[start:start + chunksize].reset_index(drop=True)
+            out = [buffer.iloc[cut:]]
+            out_rows = len(buffer) - cut
+    if out_rows:
+        yield pd.concat(out, ignore_index=True)
+
@@ -0,0 +1,129 @@
+from collections import deque
+
+# -----------------------------
+# Compiled domain -> category lookup
+# -----------------------------
+
+class DomainIndex:
+    """Aho-Corasick automaton over the keys of a domain-category map.
+
+    Mirrors the first-match-wins substring scan of
+    ``for known_domain, cat in domain_map.items(): if known_domain in dom``:
+    every node stores the lowest insertion rank of any key ending there (or
+    along its failure chain), so one pass over the domain string finds the
+    earliest-inserted key that occurs in it. Lookup cost depends on the length
+    of the domain, not on the size of the map.
+    """
+
+    _NO_MATCH = float("inf")
+
+    def __init__(self, domain_map):
+        self.size = len(domain_map)
+        self.categories = list(domain_map.values())
+        self._goto = [{}]
+        self._fail = [0]
+        self._best = [self._NO_MATCH]
+        self._empty_key_rank = self._NO_MATCH
+
+        for rank, known_domain in enumerate(domain_map):
+            if known_domain == "":
+                # "" in dom is always True
+                self._empty_key_rank = min(self._empty_key_rank, rank)
+                continue
+            node = 0
+            for ch in known_domain:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._best.append(self._NO_MATCH)
+                node = nxt
+            if rank < self._best[node]:
+                self._best[node] = rank
+
+        # Breadth-first pass: failure links and inherited best rank
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                target = self._goto[f].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                if self._best[self._fail[nxt]] < self._best[nxt]:
+                    self._best[nxt] = self._best[self._fail[nxt]]
+                queue.append(nxt)
+
+    def lookup(self, dom):
+        """Return the category of the first map key contained in ``dom``, or None."""
+        goto, fail, best = self._goto, self._fail, self._best
+        found = self._empty_key_rank
+        node = 0
+        for ch in dom:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if best[node] < found:
+                found = best[node]
+                if found == 0:
+                    break
+        if found == self._NO_MATCH:
+            return None
+        return self.categories[found]
+
+
+class DomainMap(dict):
+    """dict that counts its edits, so a compiled view can tell in O(1) whether it is stale.
+
+    Every mutating method bumps ``version``; DomainIndex builds are keyed on
+    (id(map), version) instead of on the map's contents.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.version = 0
+
+    def _edited(self):
+        self.version += 1
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._edited()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._edited()
+
+    def __ior__(self, other):
+        super().__ior__(other)
+        self._edited()
+        return self
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self._edited()
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self._edited()
+        return super().setdefault(key, default)
+
+    def pop(self, *args):
+        value = super().pop(*args)
+        self._edited()
+        return value
+
+    def popitem(self):
+        item = super().popitem()
+        self._edited()
+        return item
+
+    def clear(self):
+        super().clear()
+        self._edited()
+
+    def __reduce__(self):
+        return (DomainMap, (dict(self),))
@@ -0,0 +1,290 @@
+import math
+import numpy as np
+import pandas as pd
+
+# -----------------------------
+# Sketch-based domain statistics for streaming ingestion
+# -----------------------------
+# Fixed-memory, mergeable summaries: sketches built on separate shards (users,
+# chunks, worker processes) combine with merge() into the sketch of the union.
+# Items are hashed with pandas' stable 64-bit hash, so sketches built in
+# different processes agree.
+HLL_MIN_PRECISION = 4
+HLL_MAX_PRECISION = 18
+
+
+def _hash(items):
+    """Stable uint64 hash of every item (as str)."""
+    return pd.util.hash_pandas_object(pd.Series(items, dtype=object).astype(str), index=False).to_numpy()
+
+
+def _drop_missing(*columns):
+    """Drop positions where any column is null or an empty string (columns must have equal lengths)."""
+    if len({len(col) for col in columns}) > 1:
+        raise ValueError(f"Columns have different lengths: {[len(col) for col in columns]}.")
+    keep = np.ones(len(columns[0]), dtype=bool)
+    values = []
+    for col in columns:
+        col = pd.Series(col)
+        keep &= col.notna().to_numpy()
+        if col.dtype.kind in "biufmM":   # numbers and datetimes stay native (no empty strings to drop)
+            values.append(col.to_numpy())
+        else:
+            keep &= (col != "").to_numpy(dtype=bool, na_value=False)
+            values.append(col.to_numpy(dtype=object))
+    return [col[keep] for col in values]
+
+
+class CountMinSketch:
+    """Point-frequency estimates that never undercount.
+
+    With width = ceil(e / epsilon) and depth = ceil(ln(1 / delta)), an estimate
+    exceeds the true count by more than epsilon * total with probability at most
+    delta.
+    """
+
+    def __init__(self, epsilon=0.001, delta=0.01):
+        self.epsilon = epsilon
+        self.delta = delta
+        self.width = int(math.ceil(math.e / epsilon))
+        self.depth = int(math.ceil(math.log(1 / delta)))
+        self.table = np.zeros((self.depth, self.width), dtype=np.int64)
+        self.total = 0
+
+    def _columns(self, hashes):
+        # Kirsch-Mitzenmacher: row i uses h1 + i * h2
+        h1 = hashes & np.uint64(0xFFFFFFFF)
+        h2 = hashes >> np.uint64(32)
+        rows = np.arange(self.depth, dtype=np.uint64)[:, None]
+        return ((h1[None, :] + rows * h2[None, :]) % np.uint64(self.width)).astype(np.int64)
+
+    def update(self, items, counts=None):
+        if counts is None:
+            items, = _drop_missing(items)
+            counts = np.ones(len(items), dtype=np.int64)
+        else:
+            items, counts = _drop_missing(items, counts)
+            counts = counts.astype(np.int64)
+        if not len(items):
+            return self
+        cols = self._columns(_hash(items))
+        for row in range(self.depth):
+            self.table[row] += np.bincount(cols[row], weights=counts, minlength=self.width).astype(np.int64)
+        self.total += int(counts.sum())
+        return self
+
+    def estimate(self, items):
+        """Estimated count of each item (>= the true count)."""
+        cols = self._columns(_hash(items))
+        return self.table[np.arange(self.depth)[:, None], cols].min(axis=0)
+
+    def merge(self, other):
+        if (self.width, self.depth) != (other.width, other.depth):
+            raise ValueError("Can only merge Count-Min sketches with the same epsilon and delta.")
+        self.table += other.table
+        self.total += other.total
+        return self
+
+
+class SpaceSaving:
+    """Top-k heavy hitters in O(k) memory.
+
+    Keeps at most `capacity` counters; every monitored count overestimates the
+    true count by at most its recorded error, and the error is at most
+    total / capacity. Any item with a true count above total / capacity is
+    guaranteed to be monitored. Batches are folded in with the same rule used to
+    merge two summaries (an unmonitored item is assumed to have the summary's
+    minimum count), so update() and merge() keep the same guarantees.
+    """
+
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.counts = pd.Series(dtype="int64")
+        self.errors = pd.Series(dtype="int64")
+        self.total = 0
+
+    def _floor(self):
+        """Count assumed for items this summary does not monitor."""
+        return int(self.counts.min()) if len(self.counts) >= self.capacity else 0
+
+    def _combine(self, counts, errors, floor, total):
+        index = self.counts.index.union(counts.index)
+        mine = self._floor()
+        merged = self.counts.reindex(index, fill_value=mine) + counts.reindex(index, fill_value=floor)
+        merged_err = self.errors.reindex(index, fill_value=mine) + errors.reindex(index, fill_value=floor)
+        # keep the largest counters; ties broken by item so the result is order-independent
+        ranked = pd.DataFrame({"count": merged, "item": index.astype(str)}, index=index)
+        ranked = ranked.sort_values(["count", "item"], ascending=[False, True], kind="stable")
+        keep = ranked.index[:self.capacity]
+        self.counts = merged[keep].astype("int64")
+        self.errors = merged_err[keep].astype("int64")
+        self.total += total
+        return self
+
+    def update(self, items):
+        items, = _drop_missing(items)
+        batch = pd.Series(items, dtype=object).value_counts()
+        return self._combine(batch, pd.Series(0, index=batch.index, dtype="int64"), 0, int(batch.sum()))
+
+    def merge(self, other):
+        return self._combine(other.counts, other.errors, other._floor(), other.total)
+
+    def top(self, n=20):
+        """The n largest counters: item, count (upper bound) and error."""
+        out = pd.DataFrame({"count": self.counts, "error": self.errors}).head(n)
+        return out.rename_axis("item").reset_index()
+
+
+class HyperLogLog:
+    """Distinct-count estimate with relative standard error about 1.04 / sqrt(2**precision)."""
+
+    def __init__(self, precision=None, error=0.01):
+        self.precision = precision or HyperLogLog.precision_for(error)
+        self.registers = np.zeros(1 << self.precision, dtype=np.uint8)
+
+    @staticmethod
+    def precision_for(error):
+        """Smallest precision whose standard error is at most `error`."""
+        p = int(math.ceil(math.log2((1.04 / error) ** 2)))
+        return min(max(p, HLL_MIN_PRECISION), HLL_MAX_PRECISION)
+
+    @staticmethod
+    def _positions(hashes, precision):
+        """Register index and rank (1 + leading zeros of the remaining bits) per hash."""
+        bits = 64 - precision
+        idx = (hashes >> np.uint64(bits)).astype(np.int64)
+        rest = hashes & np.uint64((1 << bits) - 1)
+        # only the top 52 bits of `rest` go through float64, where log2 is exact
+        shift = max(bits - 52, 0)
+        top = (rest >> np.uint64(shift)).astype(np.float64)
+        width = bits - shift
+        with np.errstate(divide="ignore"):
+            rank = np.where(top > 0, width - np.floor(np.log2(top)), bits + 1)
+        return idx, rank.astype(np.uint8)
+
+    @staticmethod
+    def _estimate(registers):
+        """Estimates for a (..., m) register array, with the small-range correction."""
+        m = registers.shape[-1]
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+        raw = alpha * m * m / np.power(2.0, -registers.astype(np.float64)).sum(axis=-1)
+        zeros = (registers == 0).sum(axis=-1)
+        with np.errstate(divide="ignore"):
+            linear = m * np.log(m / np.maximum(zeros, 1))
+        return np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw)
+
+    def update(self, items):
+        items, = _drop_missing(items)
+        if len(items):
+            idx, rank = HyperLogLog._positions(_hash(items), self.precision)
+            np.maximum.at(self.registers, idx, rank)
+        return self
+
+    def count(self):
+        return float(HyperLogLog._estimate(self.registers))
+
+    def merge(self, other):
+        if self.precision != other.precision:
+            raise ValueError("Can only merge HyperLogLog sketches with the same precision.")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+
+class KeyedHyperLogLog:
+    """One HyperLogLog per key (user, session, day, ...) in a single register matrix."""
+
+    def __init__(self, precision=None, error=0.05):
+        self.precision = precision or HyperLogLog.precision_for(error)
+        self.rows = {}
+        self.registers = np.zeros((0, 1 << self.precision), dtype=np.uint8)
+
+    def _rows_for(self, keys):
+        codes, uniques = pd.factorize(pd.Series(keys))
+        new = [k for k in uniques if k not in self.rows]
+        if new:
+            start = len(self.rows)
+            self.rows.update({k: start + i for i, k in enumerate(new)})
+            if len(self.rows) > len(self.registers):
+                grown = np.zeros((max(len(self.rows), 2 * len(self.registers)), self.registers.shape[1]), dtype=np.uint8)
+                grown[:len(self.registers)] = self.registers
+                self.registers = grown
+        return np.array([self.rows[k] for k in uniques], dtype=np.int64)[codes]
+
+    def update(self, keys, items):
+        keys, items = _drop_missing(keys, items)
+        if len(items):
+            rows = self._rows_for(keys)
+            idx, rank = HyperLogLog._positions(_hash(items), self.precision)
+            np.maximum.at(self.registers, (rows, idx), rank)
+        return self
+
+    def counts(self):
+        """Estimated distinct items per key."""
+        keys = list(self.rows)
+        estimates = HyperLogLog._estimate(self.registers[:len(keys)])
+        return pd.Series(estimates, index=pd.Index(keys, dtype=object), name="distinct")
+
+    def merge(self, other):
+        if self.precision != other.precision:
+            raise ValueError("Can only merge HyperLogLog sketches with the same precision.")
+        keys = list(other.rows)
+        if keys:
+            rows = self._rows_for(keys)
+            self.registers[rows] = np.maximum(self.registers[rows], other.registers[:len(keys)])
+        return self
+
+
+class DomainStats:
+    """Streaming domain statistics over labeled visit chunks.
+
+    - heavy hitters: Space-Saving candidates, with counts tightened by Count-Min
+    - distinct domains per user, per day and per session (HyperLogLog)
+
+    Feed chunks with update() (Sessionization.sessionization_stream(stats=...)
+    does it for every chunk), combine shard results with merge().
+    """
+
+    def __init__(self, top_k=100, cm_epsilon=0.0005, cm_delta=0.01, hll_error=0.01, session_hll_error=0.1):
+        self.heavy = SpaceSaving(capacity=10 * top_k)
+        self.frequencies = CountMinSketch(epsilon=cm_epsilon, delta=cm_delta)
+        self.per_user = KeyedHyperLogLog(error=hll_error)
+        self.per_day = KeyedHyperLogLog(error=hll_error)
+        self.per_session = KeyedHyperLogLog(error=session_hll_error)
+
+    def update(self, visits):
+        """Add a chunk of visits with user, visit_time, domain (and session_id when assigned)."""
+        domains = visits['domain'].to_numpy(dtype=object)
+        self.heavy.update(domains)
+        self.frequencies.update(domains)
+        self.per_user.update(visits['user'].astype(str).to_numpy(dtype=object), domains)
+        self.per_day.update(visits['visit_time'].dt.floor("D"), domains)   # formatted in distinct_domains
+        if 'session_id' in visits.columns:
+            self.per_session.update(visits['session_id'].to_numpy(dtype=object), domains)
+        return self
+
+    def merge(self, other):
+        self.heavy.merge(other.heavy)
+        self.frequencies.merge(other.frequencies)
+        self.per_user.merge(other.per_user)
+        self.per_day.merge(other.per_day)
+        self.per_session.merge(other.per_session)
+        return self
+
+    def top_domains(self, n=20):
+        """Approximate `value_counts().head(n)` of the domains seen so far."""
+        top = self.heavy.top(len(self.heavy.counts))
+        if top.empty:
+            return pd.Series(dtype="int64", name="count")
+        estimate = np.minimum(top['count'].to_numpy(), self.frequencies.estimate(top['item']))
+        counts = pd.Series(estimate, index=pd.Index(top['item'], name="domain"), name="count")
+        return counts.sort_values(ascending=False, kind="stable").head(n)
+
+    def distinct_domains(self, by="user"):
+        """Approximate number of distinct domains per 'user', 'day' or 'session'."""
+        sketches = {"user": self.per_user, "day": self.per_day, "session": self.per_session}
+        if by not in sketches:
+            raise ValueError(f"Unknown level {by!r}; expected one of {sorted(sketches)}.")
+        counts = sketches[by].counts()
+        if by == "day":
+            counts.index = pd.Index([day.strftime("%Y-%m-%d") for day in counts.index], dtype=object)
+        return counts
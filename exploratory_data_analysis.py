@@ -1,129 +1,273 @@
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sessionization import Sessionization
-from data_collection import DataCollection
+import os
+import json
+import pickle
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from session_rollup import SessionRollup, WEEKDAYS
+
+# -----------------------------
+# CONFIG: precomputed rollup
+# -----------------------------
+ROLLUP_FILE = None   # e.g. "./session_rollup.pkl"; when it exists the plots never touch session/visit data
+
+# -----------------------------
+# CONFIG: rendering
+# -----------------------------
+EDA_OUTPUT_DIR = "./eda_plots"
+EDA_MANIFEST = ".eda_manifest.json"   # plot name -> hash of the aggregate it was drawn from
+EDA_VERSION = 1                       # bump when drawing code changes to re-render everything
 
 # -----------------------------
 # EDA: multiple plots and insights
 # -----------------------------
-sns.set(style="whitegrid")
-df = DataCollection.final_data()
-session_df = Sessionization.sessionization(df)
-# 1. Count of dominant categories
-plt.figure(figsize=(10,5))
-order = session_df['dominant_category'].value_counts().index
-sns.countplot(x='dominant_category', data=session_df, order=order, palette='tab10')
-plt.title("Distribution of Dominant Categories per 1-hour Session")
-plt.xlabel("Dominant Category")
-plt.ylabel("Session Count")
-plt.xticks(rotation=45)
-plt.tight_layout()
-plt.show()
-
-# 2. Category share pie chart
-plt.figure(figsize=(6,6))
-counts = session_df['dominant_category'].value_counts()
-plt.pie(counts, labels=counts.index, autopct='%1.1f%%', startangle=140)
-plt.title("Category Share Across Sessions")
-plt.tight_layout()
-plt.show()
-
-# 3. Session duration (observed span) by category (boxplot)
-plt.figure(figsize=(10,5))
-sns.boxplot(x='dominant_category', y='duration_minutes_observed', data=session_df, order=order)
-plt.title("Observed Session Span (minutes) by Dominant Category")
-plt.xlabel("Dominant Category")
-plt.ylabel("Observed Span (minutes)")
-plt.xticks(rotation=45)
-plt.tight_layout()
-plt.show()
-
-# 4. Number of visits by category (boxplot)
-plt.figure(figsize=(10,5))
-sns.boxplot(x='dominant_category', y='num_visits', data=session_df, order=order)
-plt.title("Number of Visits per Session by Dominant Category")
-plt.xlabel("Dominant Category")
-plt.ylabel("Number of Visits")
-plt.xticks(rotation=45)
-plt.tight_layout()
-plt.show()
-
-# 5. Correlation heatmap of numeric features
-numeric_cols = ['num_visits', 'unique_domains', 'duration_minutes_observed', 'duration_minutes']
-corr_df = session_df[numeric_cols].corr()
-plt.figure(figsize=(7,5))
-sns.heatmap(corr_df, annot=True, fmt=".2f", cmap='Blues')
-plt.title("Correlation of Numeric Session Features")
-plt.tight_layout()
-plt.show()
-
-# 6. Hourly activity pattern
-session_df['hour'] = session_df['session_start'].dt.hour
-plt.figure(figsize=(12,4))
-sns.countplot(x='hour', data=session_df, palette='crest')
-plt.title("Sessions per Hour of Day")
-plt.xlabel("Hour")
-plt.ylabel("Number of Sessions")
-plt.tight_layout()
-plt.show()
-
-# 7. Weekly pattern
-session_df['weekday'] = session_df['session_start'].dt.day_name()
-order_week = ['Monday','Tuesday','Wednesday','Thursday','Friday','Saturday','Sunday']
-plt.figure(figsize=(12,4))
-sns.countplot(x='weekday', data=session_df, order=order_week, palette='Spectral')
-plt.title("Sessions per Day of Week")
-plt.xlabel("Day of Week")
-plt.ylabel("Number of Sessions")
-plt.tight_layout()
-plt.show()
-
-# 8. Top domains overall
-top_domains = df['domain'].value_counts().head(20)
-plt.figure(figsize=(10,6))
-sns.barplot(x=top_domains.values, y=top_domains.index, palette='mako')
-plt.title("Top 20 Visited Domains")
-plt.xlabel("Visit Count")
-plt.ylabel("Domain")
-plt.tight_layout()
-plt.show()
-
-# 9. Avg unique domains per session by category
-avg_unique = session_df.groupby('dominant_category')['unique_domains'].mean().sort_values(ascending=False)
-plt.figure(figsize=(8,4))
-sns.barplot(x=avg_unique.values, y=avg_unique.index, palette='viridis')
-plt.title("Average Unique Domains per Session by Category")
-plt.xlabel("Avg Unique Domains")
-plt.ylabel("Category")
-plt.tight_layout()
-plt.show()
-
-# 10. Hour vs Category heatmap
-hour_cat = session_df.groupby(['hour','dominant_category']).size().unstack(fill_value=0)
-plt.figure(figsize=(12,6))
-sns.heatmap(hour_cat, cmap='YlGnBu')
-plt.title("Heatmap: Hour of Day vs Dominant Category")
-plt.xlabel("Category")
-plt.ylabel("Hour")
-plt.tight_layout()
-plt.show()
-
-# 11. Duration vs visits scatter
-plt.figure(figsize=(8,6))
-sns.scatterplot(x='num_visits', y='duration_minutes_observed', hue='dominant_category', data=session_df, alpha=0.7)
-plt.title("Observed Duration vs Number of Visits (colored by category)")
-plt.xlabel("Number of Visits")
-plt.ylabel("Observed Duration (minutes)")
-plt.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
-plt.tight_layout()
-plt.show()
-
-# 12. Category composition per user (stacked counts)
-plt.figure(figsize=(10,6))
-sns.countplot(x='user', hue='dominant_category', data=session_df, palette='Set3')
-plt.title("Category Counts per User")
-plt.xlabel("User")
-plt.ylabel("Number of Sessions")
-plt.legend(title='Category', bbox_to_anchor=(1.05,1))
-plt.tight_layout()
-plt.show()
\ No newline at end of file
+# Each plot = (rollup parts it needs, data(rollup) -> small aggregate, draw(plt, sns, data)).
+# Only the selected plots' parts are computed, and only their aggregates are shipped to
+# the renderer (this process, or worker processes with workers > 1); matplotlib/seaborn
+# are imported when a plot is drawn, never at import.
+
+def _category_order(rollup):
+    return rollup.category_counts()
+
+
+def _draw_dominant_counts(plt, sns, counts):
+    plt.figure(figsize=(10,5))
+    sns.barplot(x=counts.index, y=counts.values, order=counts.index, palette='tab10')
+    plt.title("Distribution of Dominant Categories per 1-hour Session")
+    plt.xlabel("Dominant Category")
+    plt.ylabel("Session Count")
+    plt.xticks(rotation=45)
+
+
+def _draw_category_share(plt, sns, counts):
+    plt.figure(figsize=(6,6))
+    plt.pie(counts, labels=counts.index, autopct='%1.1f%%', startangle=140)
+    plt.title("Category Share Across Sessions")
+
+
+def _draw_duration_box(plt, sns, stats):
+    plt.figure(figsize=(10,5))
+    plt.gca().bxp(stats, showfliers=False)
+    plt.title("Observed Session Span (minutes) by Dominant Category")
+    plt.xlabel("Dominant Category")
+    plt.ylabel("Observed Span (minutes)")
+    plt.xticks(rotation=45)
+
+
+def _draw_visits_box(plt, sns, stats):
+    plt.figure(figsize=(10,5))
+    plt.gca().bxp(stats, showfliers=False)
+    plt.title("Number of Visits per Session by Dominant Category")
+    plt.xlabel("Dominant Category")
+    plt.ylabel("Number of Visits")
+    plt.xticks(rotation=45)
+
+
+def _draw_correlation(plt, sns, corr_df):
+    plt.figure(figsize=(7,5))
+    sns.heatmap(corr_df, annot=True, fmt=".2f", cmap='Blues')
+    plt.title("Correlation of Numeric Session Features")
+
+
+def _draw_hourly(plt, sns, per_hour):
+    plt.figure(figsize=(12,4))
+    sns.barplot(x=per_hour.index, y=per_hour.values, palette='crest')
+    plt.title("Sessions per Hour of Day")
+    plt.xlabel("Hour")
+    plt.ylabel("Number of Sessions")
+
+
+def _draw_weekly(plt, sns, per_weekday):
+    plt.figure(figsize=(12,4))
+    sns.barplot(x=per_weekday.index, y=per_weekday.values, order=WEEKDAYS, palette='Spectral')
+    plt.title("Sessions per Day of Week")
+    plt.xlabel("Day of Week")
+    plt.ylabel("Number of Sessions")
+
+
+def _draw_top_domains(plt, sns, top_domains):
+    plt.figure(figsize=(10,6))
+    sns.barplot(x=top_domains['visits'], y=top_domains['domain'], palette='mako')
+    plt.title("Top 20 Visited Domains")
+    plt.xlabel("Visit Count")
+    plt.ylabel("Domain")
+
+
+def _draw_avg_unique(plt, sns, avg_unique):
+    plt.figure(figsize=(8,4))
+    sns.barplot(x=avg_unique.values, y=avg_unique.index, palette='viridis')
+    plt.title("Average Unique Domains per Session by Category")
+    plt.xlabel("Avg Unique Domains")
+    plt.ylabel("Category")
+
+
+def _draw_hour_category(plt, sns, hour_cat):
+    plt.figure(figsize=(12,6))
+    sns.heatmap(hour_cat, cmap='YlGnBu')
+    plt.title("Heatmap: Hour of Day vs Dominant Category")
+    plt.xlabel("Category")
+    plt.ylabel("Hour")
+
+
+def _draw_duration_vs_visits(plt, sns, sample):
+    plt.figure(figsize=(8,6))
+    sns.scatterplot(x='num_visits', y='duration_minutes_observed', hue='dominant_category', data=sample, alpha=0.7)
+    plt.title("Observed Duration vs Number of Visits (colored by category, sampled sessions)")
+    plt.xlabel("Number of Visits")
+    plt.ylabel("Observed Duration (minutes)")
+    plt.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
+
+
+def _draw_user_category(plt, sns, user_cat):
+    plt.figure(figsize=(10,6))
+    sns.barplot(x='user', y='sessions', hue='dominant_category', data=user_cat, palette='Set3')
+    plt.title("Category Counts per User")
+    plt.xlabel("User")
+    plt.ylabel("Number of Sessions")
+    plt.legend(title='Category', bbox_to_anchor=(1.05,1))
+
+
+PLOTS = {
+    # 1. Count of dominant categories
+    "dominant_counts": (("cube",), _category_order, _draw_dominant_counts),
+    # 2. Category share pie chart
+    "category_share": (("cube",), _category_order, _draw_category_share),
+    # 3. Session duration (observed span) by category (boxplot)
+    "duration_box": (("cube", "box_stats"),
+                     lambda r: r.box_stats_for('duration_minutes_observed', _category_order(r).index),
+                     _draw_duration_box),
+    # 4. Number of visits by category (boxplot)
+    "visits_box": (("cube", "box_stats"),
+                   lambda r: r.box_stats_for('num_visits', _category_order(r).index),
+                   _draw_visits_box),
+    # 5. Correlation heatmap of numeric features
+    "correlation": (("correlation",), lambda r: r.correlation, _draw_correlation),
+    # 6. Hourly activity pattern
+    "hourly": (("cube",), lambda r: r.counts_by('hour'), _draw_hourly),
+    # 7. Weekly pattern
+    "weekly": (("cube",), lambda r: r.counts_by('weekday').rename(lambda d: WEEKDAYS[d]), _draw_weekly),
+    # 8. Top domains overall
+    "top_domains": (("top_domains",), lambda r: r.top_domains.head(20), _draw_top_domains),
+    # 9. Avg unique domains per session by category
+    "avg_unique": (("cube",), lambda r: r.category_means('unique_domains').sort_values(ascending=False),
+                   _draw_avg_unique),
+    # 10. Hour vs Category heatmap
+    "hour_category": (("cube",), lambda r: r.crosstab('hour', 'dominant_category'), _draw_hour_category),
+    # 11. Duration vs visits scatter
+    "duration_vs_visits": (("sample",), lambda r: r.sample, _draw_duration_vs_visits),
+    # 12. Category composition per user (stacked counts)
+    "user_category": (("cube",),
+                      lambda r: r.crosstab('user', 'dominant_category').stack().rename('sessions').reset_index(),
+                      _draw_user_category),
+}
+
+
+def _render(task):
+    """Draw one plot into `path` (module level so it pickles into worker processes)."""
+    name, data, path, backend = task
+    import matplotlib
+    matplotlib.use(backend)
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    sns.set(style="whitegrid")
+    PLOTS[name][2](plt, sns, data)
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close("all")
+    return path
+
+
+def _fingerprint(name, data, fmt):
+    payload = pickle.dumps((EDA_VERSION, name, fmt, data), protocol=4)
+    return hashlib.sha1(payload).hexdigest()
+
+
+def run_eda(session_df=None, plots=None, output_dir=EDA_OUTPUT_DIR, backend="Agg", fmt="png",
+            visits_df=None, rollup=None, workers=1, force=False):
+    """Render the selected EDA plots to `output_dir` and return {plot name: file path}.
+
+    Pass a session table (plus `visits_df` for the top-domains chart) or a prebuilt
+    SessionRollup. Only the rollup parts the selected plots need are computed.
+    A plot whose aggregate is unchanged since its last render (tracked in
+    EDA_MANIFEST inside `output_dir`) is skipped unless force=True.
+
+    Plots are rendered in this process by default. workers=N (None: one per core)
+    renders them in a process pool instead, up to the plot count. Under the spawn
+    start method (the default on macOS and Windows) the calling script must then
+    be guarded by ``if __name__ == "__main__":``.
+    """
+    plots = list(PLOTS) if plots is None else list(plots)
+    unknown = [p for p in plots if p not in PLOTS]
+    if unknown:
+        raise ValueError(f"Unknown plots {unknown}; expected some of {list(PLOTS)}.")
+    if fmt not in ("png", "svg"):
+        raise ValueError("fmt must be 'png' or 'svg'.")
+    if rollup is None:
+        if session_df is None:
+            raise ValueError("run_eda needs a session_df or a rollup.")
+        parts = sorted({part for p in plots for part in PLOTS[p][0]})
+        rollup = SessionRollup.build(session_df, visits_df, parts=parts)
+
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, EDA_MANIFEST)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    paths, tasks, fingerprints = {}, [], {}
+    for name in plots:
+        data = PLOTS[name][1](rollup)
+        path = os.path.join(output_dir, f"{name}.{fmt}")
+        paths[name] = path
+        fingerprints[name] = _fingerprint(name, data, fmt)
+        if force or manifest.get(f"{name}.{fmt}") != fingerprints[name] or not os.path.exists(path):
+            tasks.append((name, data, path, backend))
+
+    workers = min(workers or os.cpu_count() or 1, len(tasks)) if tasks else 0
+    if workers == 1:
+        import matplotlib
+        previous = matplotlib.get_backend()
+        for task in tasks:
+            _render(task)
+        matplotlib.use(previous)   # _render switched to `backend`; give the caller theirs back
+    elif workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(_render, tasks))
+
+    for name, _, _, _ in tasks:
+        manifest[f"{name}.{fmt}"] = fingerprints[name]
+    tmp = manifest_path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, manifest_path)
+    print(f"✅ EDA: {len(tasks)} plots rendered, {len(plots) - len(tasks)} unchanged, in {output_dir}")
+    return paths
+
+
+def load_rollup():
+    """Rollup from ROLLUP_FILE, the store, or a fresh sessionization (saved to ROLLUP_FILE when set)."""
+    from sessionization import Sessionization
+    from data_collection import DataCollection
+
+    if ROLLUP_FILE and os.path.exists(ROLLUP_FILE):
+        return SessionRollup.load(ROLLUP_FILE)
+    store = DataCollection.open_store()
+    if store is not None and store.exists("sessions") and store.exists("labeled_visits"):
+        # Only the session table and the visit column the rollup needs
+        session_df = store.read("sessions")
+        df = store.read("labeled_visits", columns=["user", "visit_time", "domain"])
+    else:
+        df = DataCollection.final_data()
+        session_df = Sessionization.sessionization(df)
+        if store is not None:
+            store.write("labeled_visits", df)
+            store.write("sessions", session_df)
+    rollup = SessionRollup.build(session_df, df)
+    if ROLLUP_FILE:
+        rollup.save(ROLLUP_FILE)
+    return rollup
+
+
+if __name__ == "__main__":
+    run_eda(rollup=load_rollup(), workers=None)
@@ -0,0 +1,192 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.feature_extraction import FeatureHasher
+from sklearn.utils import murmurhash3_32
+from sessionization import Sessionization
+from instrumentation import stage
+
+# -----------------------------
+# CONFIG: session features
+# -----------------------------
+FEATURE_BATCH_SIZE = 100_000   # sessions turned into one sparse block at a time
+HASH_FEATURES = 2**16          # hashed domain-token columns
+COUNT_FEATURES = ('num_visits', 'unique_domains', 'duration_minutes_observed', 'duration_minutes')
+
+
+def known_categories():
+    """Every category the labeling rules can produce, in a stable order."""
+    names = [name for name, _ in Sessionization.get_keyword_matcher().patterns]
+    names += Sessionization.DEFAULT_DOMAIN_MAP.values()
+    names += ["General Search", "Miscellaneous"]
+    return sorted(set(names))
+
+
+def domain_tokens(domains):
+    """Hashing tokens of a session's domains: each full domain and its labels except the TLD."""
+    tokens = set()
+    for domain in domains:
+        if not isinstance(domain, str) or not domain:
+            continue
+        tokens.add("d=" + domain)
+        tokens.update("t=" + label for label in domain.split(".")[:-1] if label)
+    return tokens
+
+
+def hash_token(token, n_features):
+    """Column of `token` in the hashed block, where FeatureHasher(alternate_sign=False) puts it."""
+    h = murmurhash3_32(token, seed=0)
+    if h == -2**31:
+        return (2**31 - 1 - (n_features - 1)) % n_features
+    return abs(h) % n_features
+
+
+class SessionFeatures:
+    """Session table -> scipy CSR feature matrix, built batch by batch.
+
+    Column blocks (in this order):
+      - category proportions, one column per category in `categories`
+      - log1p of COUNT_FEATURES
+      - session start hour (one-hot, plus sin/cos) and weekday (one-hot)
+      - hashed domain tokens (`n_hash` columns) from `domains_list`, i.e. the
+        session table of sessionization(df, lists=True); without that column
+        the block stays empty
+
+    The layout depends only on the constructor arguments, so batches, shards and
+    later scoring runs share the same columns. Proportion columns of categories
+    outside `categories` are ignored.
+    """
+
+    def __init__(self, categories=None, n_hash=HASH_FEATURES):
+        self.categories = list(categories) if categories is not None else known_categories()
+        self.n_hash = n_hash
+        self._hasher = FeatureHasher(n_features=n_hash, input_type="string", alternate_sign=False)
+        self._category_index = {c: i for i, c in enumerate(self.categories)}
+
+    def feature_names(self):
+        return (
+            [f"prop={c}" for c in self.categories]
+            + [f"log1p_{c}" for c in COUNT_FEATURES]
+            + [f"hour={h}" for h in range(24)] + ["hour_sin", "hour_cos"]
+            + [f"weekday={d}" for d in range(7)]
+            + [f"domain_hash_{i}" for i in range(self.n_hash)]
+        )
+
+    @property
+    def n_features(self):
+        return self.hash_offset + self.n_hash
+
+    @property
+    def hash_offset(self):
+        """Index of the first hashed domain-token column."""
+        return len(self.categories) + len(COUNT_FEATURES) + 24 + 2 + 7
+
+    # ---- transform ----
+    def transform(self, batch):
+        """CSR matrix (float32) for the sessions in `batch` (a slice of the session table)."""
+        n = len(batch)
+        blocks = [self._proportions(batch), self._counts(batch), self._time(batch)]
+        if 'domains_list' in batch.columns:
+            blocks.append(self._hasher.transform(domain_tokens(d) for d in batch['domains_list']))
+        else:
+            blocks.append(sp.csr_matrix((n, self.n_hash), dtype=np.float32))
+        return sp.hstack(blocks, format="csr", dtype=np.float32)
+
+    def row(self, category_counts, num_visits, unique_domains, duration_observed, duration_minutes,
+            session_start, token_counts=None):
+        """(column indices, values) of one session, the same columns transform() would produce.
+
+        Built from running aggregates instead of a session table (online scoring):
+        `category_counts` maps category -> visits and `token_counts` maps hashed
+        column (0..n_hash-1) -> number of distinct domain tokens hashed there.
+        Without `token_counts` only the non-hashed columns are returned.
+        """
+        n_cat = len(self.categories)
+        total = sum(category_counts.values())
+        indices, values = [], []
+        for category, count in category_counts.items():
+            i = self._category_index.get(category)
+            if i is not None and count:
+                indices.append(i)
+                values.append(count / total)
+        for k, value in enumerate((num_visits, unique_domains, duration_observed, duration_minutes)):
+            if value:
+                indices.append(n_cat + k)
+                values.append(np.log1p(max(value, 0)))
+        base = n_cat + len(COUNT_FEATURES)
+        angle = 2 * np.pi * session_start.hour / 24
+        indices += [base + session_start.hour, base + 24, base + 25, base + 26 + session_start.dayofweek]
+        values += [1.0, np.sin(angle), np.cos(angle), 1.0]
+        if token_counts:
+            indices += [self.hash_offset + i for i in token_counts]
+            values += token_counts.values()
+        return np.asarray(indices, dtype=np.int64), np.asarray(values, dtype=np.float32)
+
+    def _proportions(self, batch):
+        positions = [i for i, c in enumerate(self.categories) if c in batch.columns]
+        values = batch[[self.categories[i] for i in positions]].to_numpy(dtype=np.float32, na_value=0)
+        rows, cols = np.nonzero(values)
+        return sp.csr_matrix(
+            (values[rows, cols], (rows, np.asarray(positions, dtype=np.int64)[cols])),
+            shape=(len(batch), len(self.categories)),
+        )
+
+    def _counts(self, batch):
+        values = batch[list(COUNT_FEATURES)].apply(pd.to_numeric, errors="coerce")
+        return sp.csr_matrix(np.log1p(values.to_numpy(dtype=np.float32, na_value=0).clip(min=0)))
+
+    def _time(self, batch):
+        n = len(batch)
+        start = pd.to_datetime(batch['session_start'])
+        hour = start.dt.hour.to_numpy()
+        weekday = start.dt.dayofweek.to_numpy()
+        angle = 2 * np.pi * hour / 24
+        rows = np.repeat(np.arange(n), 4)
+        cols = np.column_stack([hour, np.full(n, 24), np.full(n, 25), 26 + weekday]).ravel()
+        data = np.column_stack([np.ones(n), np.sin(angle), np.cos(angle), np.ones(n)]).ravel()
+        return sp.csr_matrix((data, (rows, cols)), shape=(n, 33), dtype=np.float32)
+
+    # ---- batching ----
+    def iter_batches(self, session_df, target=None, batch_size=FEATURE_BATCH_SIZE):
+        """Yield (X, y) per `batch_size` sessions; y is None without a `target` Series.
+
+        Sessions whose target is missing (e.g. each user's last session for
+        next_intent) are left out of both X and y.
+        """
+        for start in range(0, len(session_df), batch_size):
+            batch = session_df.iloc[start:start + batch_size]
+            y = None
+            if target is not None:
+                y = target.iloc[start:start + batch_size]
+                keep = y.notna().to_numpy()
+                batch, y = batch[keep], y[keep].to_numpy(dtype=object)
+            if len(batch) == 0:
+                continue
+            with stage("features", rows=len(batch)) as s:
+                X = self.transform(batch)
+                s.set(nnz=X.nnz, matrix_bytes=matrix_bytes(X))
+            yield X, y
+
+    def transform_all(self, session_df, batch_size=FEATURE_BATCH_SIZE):
+        """Whole feature matrix, stacked from the sparse batches."""
+        blocks = [X for X, _ in self.iter_batches(session_df, batch_size=batch_size)]
+        if not blocks:
+            return sp.csr_matrix((0, self.n_features), dtype=np.float32)
+        return sp.vstack(blocks, format="csr")
+
+
+def matrix_bytes(X):
+    """Memory held by a CSR matrix's data, indices and indptr arrays."""
+    return X.data.nbytes + X.indices.nbytes + X.indptr.nbytes
+
+
+def next_intent(session_df):
+    """Target for intent prediction: the dominant category of the user's next session.
+
+    Aligned with `session_df` (sorted by start within each user); each user's last
+    session has no next session and gets None.
+    """
+    order = session_df.sort_values(['user', 'session_start'], kind='stable').index
+    ordered = session_df.loc[order]
+    nxt = ordered.groupby('user', observed=True, sort=False)['dominant_category'].shift(-1)
+    return nxt.astype(object).where(nxt.notna(), None).reindex(session_df.index)
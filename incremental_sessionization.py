@@ -0,0 +1,125 @@
+import os
+import json
+import pandas as pd
+from sessionization import Sessionization
+
+# -----------------------------
+# Incremental sessionization: only re-aggregate sessions touched by new visits
+# -----------------------------
+
+class IncrementalSessionization:
+    """Keep a session table current from newly appended visits.
+
+    State lives in `state_dir`:
+      - sessions.pkl       the session table built so far
+      - open_visits.pkl    labeled visits of each user's latest session, the only
+                           session a later visit can still extend
+      - watermarks.json    per-user high-water mark (latest visit_time processed)
+
+    Each update only labels visits newer than the user's watermark and only
+    re-aggregates the sessions those visits fall in, so a daily refresh costs as
+    much as the day's data rather than the whole history. Visits at or before a
+    user's watermark are treated as already processed.
+    """
+
+    SESSIONS_FILE = "sessions.pkl"
+    OPEN_VISITS_FILE = "open_visits.pkl"
+    WATERMARKS_FILE = "watermarks.json"
+
+    def __init__(self, state_dir, lists=False, engine=None):
+        if engine is not None and engine.overlapping:
+            raise ValueError("Incremental sessionization needs non-overlapping sessions.")
+        self.state_dir = state_dir
+        self.lists = lists
+        self.engine = engine
+        os.makedirs(state_dir, exist_ok=True)
+        self.sessions, self.open_visits, self.watermarks = self.load()
+
+    def _path(self, name):
+        return os.path.join(self.state_dir, name)
+
+    def load(self):
+        """Read persisted state (empty state on first run)."""
+        sessions = None
+        open_visits = None
+        watermarks = {}
+        if os.path.exists(self._path(self.SESSIONS_FILE)):
+            sessions = pd.read_pickle(self._path(self.SESSIONS_FILE))
+        if os.path.exists(self._path(self.OPEN_VISITS_FILE)):
+            open_visits = pd.read_pickle(self._path(self.OPEN_VISITS_FILE))
+        if os.path.exists(self._path(self.WATERMARKS_FILE)):
+            with open(self._path(self.WATERMARKS_FILE)) as f:
+                watermarks = {user: pd.Timestamp(ts) for user, ts in json.load(f).items()}
+        return sessions, open_visits, watermarks
+
+    def save(self):
+        """Persist state; each file is written to a temp name and swapped in."""
+        def replace(name, write):
+            tmp = self._path(name + ".tmp")
+            write(tmp)
+            os.replace(tmp, self._path(name))
+
+        if self.sessions is not None:
+            replace(self.SESSIONS_FILE, self.sessions.to_pickle)
+        if self.open_visits is not None:
+            replace(self.OPEN_VISITS_FILE, self.open_visits.to_pickle)
+
+        def write_watermarks(path):
+            with open(path, "w") as f:
+                json.dump({user: ts.isoformat() for user, ts in self.watermarks.items()}, f, indent=2)
+        replace(self.WATERMARKS_FILE, write_watermarks)
+
+    def new_visits(self, df):
+        """Rows of `df` later than their user's watermark."""
+        users = df['user'].astype(str)
+        marks = pd.to_datetime(users.map(self.watermarks))
+        is_new = marks.isna() | (df['visit_time'] > marks)
+        skipped = int((~is_new).sum())
+        if skipped:
+            print(f"ℹ️ Skipped {skipped} visits at or before the stored high-water marks.")
+        return df[is_new.to_numpy()].copy()
+
+    def update(self, df):
+        """Fold visits into the stored session table and return the updated table.
+
+        `df` may be the full history or just the newly collected visits.
+        """
+        new = self.new_visits(df)
+        if new.empty:
+            return self.sessions
+
+        # Label only the new visits
+        new['user'] = new['user'].astype(str)
+        Sessionization.label_visits(new)
+
+        # Re-bucket them together with the reopened sessions (a gap session may continue)
+        touched_users = set(new['user'].unique())
+        visits = new
+        if self.open_visits is not None:
+            reopened = self.open_visits[self.open_visits['user'].isin(touched_users)]
+            visits = pd.concat([reopened, new], ignore_index=True)
+        visits = visits.sort_values(['user', 'visit_time'], kind='stable').reset_index(drop=True)
+        Sessionization.assign_sessions(visits, self.engine)
+
+        # Re-aggregate the touched sessions and replace their old rows
+        recomputed = Sessionization.aggregate_sessions(visits, lists=self.lists, engine=self.engine)
+        pieces = [recomputed]
+        if self.sessions is not None:
+            stale = self.sessions['session_id'].isin(recomputed['session_id'])
+            pieces.insert(0, self.sessions[~stale.to_numpy()])
+        sessions = Sessionization.combine_sessions(pieces)
+        self.sessions = sessions.sort_values(['user', 'session_id'], kind='stable').reset_index(drop=True)
+
+        # Advance watermarks and keep each touched user's latest session open
+        latest = visits.groupby('user')['visit_time'].max()
+        self.watermarks.update({user: latest[user] for user in touched_users})
+        last_session = visits.groupby('user')['session_id'].transform('last')
+        still_open = visits[(visits['session_id'] == last_session).to_numpy()]
+        if self.open_visits is not None:
+            untouched = self.open_visits[~self.open_visits['user'].isin(touched_users)]
+            still_open = pd.concat([untouched, still_open], ignore_index=True)
+        self.open_visits = still_open.reset_index(drop=True)
+
+        self.save()
+        print(f"✅ Incremental sessionization: {len(new)} new visits, {len(recomputed)} sessions refreshed.")
+        return self.sessions
@@ -0,0 +1,245 @@
+import io
+import os
+import sys
+import json
+import time
+import pstats
+import cProfile
+import logging
+import tracemalloc
+import contextlib
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # not available on Windows; RSS then comes from /proc only
+    resource = None
+
+# -----------------------------
+# Stage-level instrumentation
+# -----------------------------
+# Pipeline code wraps its stages in `with stage("name", rows=n) as s:`. With no sink
+# enabled and no capture pending, stage() hands back a shared no-op object, so the
+# only cost is one function call and a truthiness check. When sinks are enabled,
+# every stage emits one record (a dict) to each sink:
+#   stage, parent, seconds, rows, rows_per_s, rss_bytes, rss_delta_bytes, error
+# plus whatever the stage adds with s.set(...) (e.g. cache hit rates).
+_sinks = []
+_capture = {}       # stage name -> {"mode", "top", "path"}; consumed by the next run of that stage
+_stack = []         # names of the stages currently running (for "parent")
+last_capture = None  # record of the most recent captured stage
+
+
+def current_rss():
+    """Resident set size in bytes (Linux /proc, else the peak from getrusage), or None."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        if resource is None:
+            return None
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024   # Linux reports KiB
+
+
+# -----------------------------
+# Sinks
+# -----------------------------
+class LoggingSink:
+    """One log line per stage through the standard logging module."""
+
+    def __init__(self, logger=None, level=logging.INFO):
+        self.logger = logger or logging.getLogger("pipeline")
+        self.level = level
+
+    def emit(self, record):
+        extra = {k: v for k, v in record.items()
+                 if k not in ("stage", "seconds", "rows", "rows_per_s", "profile", "tracemalloc_top")}
+        self.logger.log(self.level, "stage %s: %.3fs rows=%s %s", record["stage"], record["seconds"],
+                        record.get("rows"), " ".join(f"{k}={v}" for k, v in extra.items() if v is not None))
+
+
+class JsonLinesSink:
+    """Append one JSON object per stage to `path`."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "a")
+
+    def emit(self, record):
+        self._file.write(json.dumps(record, default=str) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class MemorySink:
+    """Keep records in a list; frame() and summary() turn them into DataFrames."""
+
+    def __init__(self):
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+    def frame(self):
+        return pd.DataFrame(self.records)
+
+    def summary(self):
+        """Total seconds and rows per stage, slowest first."""
+        df = self.frame()
+        if df.empty:
+            return df
+        out = df.groupby("stage", sort=False).agg(calls=("seconds", "size"), seconds=("seconds", "sum"),
+                                                   rows=("rows", "sum"))
+        out["rows_per_s"] = out["rows"] / out["seconds"]
+        return out.sort_values("seconds", ascending=False)
+
+
+# -----------------------------
+# Configuration
+# -----------------------------
+def enable(*sinks):
+    """Start sending stage records to `sinks` (in addition to any already enabled)."""
+    _sinks.extend(sinks)
+    return sinks[0] if len(sinks) == 1 else sinks
+
+
+def disable():
+    """Remove every sink (closing those that can be closed) and pending captures."""
+    for sink in _sinks:
+        if hasattr(sink, "close"):
+            sink.close()
+    _sinks.clear()
+    _capture.clear()
+
+
+@contextlib.contextmanager
+def instrumented(*sinks):
+    """Enable `sinks` for the duration of a with-block (default: a fresh MemorySink)."""
+    sinks = sinks or (MemorySink(),)
+    _sinks.extend(sinks)
+    try:
+        yield sinks[0] if len(sinks) == 1 else sinks
+    finally:
+        for sink in sinks:
+            _sinks.remove(sink)
+
+
+def capture(stage_name, mode="cprofile", top=25, path=None):
+    """Profile the next run of `stage_name` with cProfile or tracemalloc.
+
+    The stage's record gets "profile" (pstats text, cumulative order) or
+    "tracemalloc_peak_bytes" / "tracemalloc_top" (allocations by line). With
+    `path`, the raw cProfile stats are also dumped there for snakeviz/pstats.
+    The record is sent to the enabled sinks and kept in `last_capture`.
+    """
+    if mode not in ("cprofile", "tracemalloc"):
+        raise ValueError("mode must be 'cprofile' or 'tracemalloc'.")
+    _capture[stage_name] = {"mode": mode, "top": top, "path": path}
+
+
+# -----------------------------
+# Stages
+# -----------------------------
+class _NullStage:
+    active = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **fields):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    active = True
+
+    def __init__(self, name, rows, fields, capture_spec):
+        self.name = name
+        self.fields = dict(fields, rows=rows)
+        self.capture_spec = capture_spec
+        self._profiler = None
+
+    def set(self, **fields):
+        self.fields.update(fields)
+
+    def __enter__(self):
+        self.parent = _stack[-1] if _stack else None
+        _stack.append(self.name)
+        self.rss_before = current_rss()
+        if self.capture_spec is not None:
+            self._start_capture()
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.t0
+        captured = self._stop_capture() if self.capture_spec is not None else {}
+        _stack.pop()
+        rss = current_rss()
+        rows = self.fields.get("rows")
+        record = {
+            "stage": self.name,
+            "parent": self.parent,
+            "seconds": seconds,
+            **self.fields,
+            "rows_per_s": rows / seconds if rows and seconds > 0 else None,
+            "rss_bytes": rss,
+            "rss_delta_bytes": rss - self.rss_before if rss is not None and self.rss_before is not None else None,
+            "error": exc_type.__name__ if exc_type is not None else None,
+            **captured,
+        }
+        if captured:
+            global last_capture
+            last_capture = record
+        for sink in _sinks:
+            sink.emit(record)
+        return False
+
+    def _start_capture(self):
+        if self.capture_spec["mode"] == "cprofile":
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        else:
+            self._was_tracing = tracemalloc.is_tracing()
+            if not self._was_tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            self._snapshot = tracemalloc.take_snapshot()
+
+    def _stop_capture(self):
+        spec = self.capture_spec
+        if spec["mode"] == "cprofile":
+            self._profiler.disable()
+            if spec["path"]:
+                self._profiler.dump_stats(spec["path"])
+            out = io.StringIO()
+            pstats.Stats(self._profiler, stream=out).sort_stats("cumulative").print_stats(spec["top"])
+            return {"profile": out.getvalue()}
+        _, peak = tracemalloc.get_traced_memory()
+        top = tracemalloc.take_snapshot().compare_to(self._snapshot, "lineno")[:spec["top"]]
+        if not self._was_tracing:
+            tracemalloc.stop()
+        return {"tracemalloc_peak_bytes": peak, "tracemalloc_top": [str(stat) for stat in top]}
+
+
+def stage(name, rows=None, **fields):
+    """Context manager timing one pipeline stage (a no-op unless a sink or capture is set)."""
+    if not _sinks and not _capture:
+        return _NULL_STAGE
+    return _Stage(name, rows, fields, _capture.pop(name, None))
+
+
+def cache_delta(before, after):
+    """Hit rate of the lookups made between two LabelCache.stats() snapshots."""
+    hits = after["hits"] - before["hits"]
+    lookups = hits + after["misses"] - before["misses"]
+    return hits / lookups if lookups else None
@@ -0,0 +1,109 @@
+import re
+import numpy as np
+import pandas as pd
+
+# -----------------------------
+# Single-pass keyword -> category matcher
+# -----------------------------
+
+# A KW_* pattern of the form "(word|word|...)" with no other regex syntax
+_LITERAL_ALTERNATION = re.compile(r"^\(([^\\\[\](){}.*+?^$]+)\)$")
+
+
+def _trie_regex(words):
+    """Compile literal words into a prefix-trie alternation, e.g. ``s(?:hop|ale)``.
+
+    At every branch point the alternatives start with distinct characters and
+    optional tails are greedy, so a match is always the longest word starting
+    at that position.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node):
+        branches = [re.escape(ch) + build(node[ch]) for ch in sorted(k for k in node if k)]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """Find the highest-priority category whose keyword pattern occurs in a text.
+
+    Equivalent to trying ``re.search(pattern, text)`` for each (category, pattern)
+    pair in turn and returning the first category that matches. When every pattern
+    is a plain alternation of words (as the KW_* patterns are), all words go into
+    one trie-shaped regex, so a single scan over the text finds every position
+    where some keyword starts. The longest word at a position is reported, and
+    every other word matching there is one of its prefixes, so each word is
+    mapped to the best rank among its own prefixes. Other patterns fall back
+    to a search per category.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = tuple(patterns)
+        self.categories = [cat for cat, _ in self.patterns]
+        words = {}
+        for rank, (_, kw) in enumerate(self.patterns):
+            literal = _LITERAL_ALTERNATION.match(kw)
+            if literal is None:
+                words = None
+                break
+            for word in literal.group(1).split("|"):
+                if word and word not in words:
+                    words[word] = rank
+
+        if words:
+            self._word_rank = {
+                word: min(rank for prefix, rank in words.items() if word.startswith(prefix))
+                for word in words
+            }
+            self._regex = re.compile(_trie_regex(words))
+            self._regexes = None
+        else:
+            self._word_rank = None
+            self._regex = re.compile("|".join(f"(?:{kw})" for _, kw in self.patterns))
+            self._regexes = [re.compile(kw) for _, kw in self.patterns]
+
+    def match(self, text):
+        """Highest-priority category whose pattern occurs in `text`, or None."""
+        if self._word_rank is None:
+            for cat, regex in zip(self.categories, self._regexes):
+                if regex.search(text):
+                    return cat
+            return None
+
+        search, word_rank = self._regex.search, self._word_rank
+        best = len(self.patterns)
+        m = search(text)
+        while m is not None:
+            rank = word_rank[m.group()]
+            if rank < best:
+                best = rank
+                if best == 0:
+                    break
+            m = search(text, m.start() + 1)
+        return self.categories[best] if best < len(self.patterns) else None
+
+    def match_series(self, texts, default=None):
+        """Vectorized `match` over a Series of strings.
+
+        One ``Series.str.contains`` scan with the combined regex screens out texts
+        without any keyword; only the remaining texts are ranked. Returns an
+        object array aligned with `texts`; rows without a match get `default`.
+        """
+        texts = pd.Series(texts, dtype=object)
+        result = np.full(len(texts), default, dtype=object)
+        if texts.empty:
+            return result
+        hit = texts.str.contains(self._regex).to_numpy(dtype=bool)
+        if hit.any():
+            result[hit] = texts[hit].map(self.match).to_numpy(dtype=object)
+        return result
@@ -0,0 +1,88 @@
+from collections import OrderedDict
+
+# -----------------------------
+# Bounded LRU cache for URL / domain labels
+# -----------------------------
+
+class LabelCache:
+    """Size-bounded LRU mapping with hit/miss counters.
+
+    Used by Sessionization to remember labels per unique URL and per cleaned
+    domain. `maxsize=None` disables eviction, `maxsize=0` disables caching.
+    """
+
+    def __init__(self, maxsize=100_000):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def get_many(self, keys):
+        """Look up `keys` in one pass; returns (values, missing_positions)."""
+        data = self._data
+        values = [None] * len(keys)
+        missing = []
+        for i, key in enumerate(keys):
+            try:
+                values[i] = data[key]
+            except KeyError:
+                missing.append(i)
+                continue
+            data.move_to_end(key)
+        self.hits += len(keys) - len(missing)
+        self.misses += len(missing)
+        return values, missing
+
+    def put(self, key, value):
+        if self.maxsize == 0:
+            return
+        self._data[key] = value
+        self._data.move_to_end(key)
+        self._evict()
+
+    def put_many(self, keys, values):
+        if self.maxsize == 0:
+            return
+        data = self._data
+        for key, value in zip(keys, values):
+            data[key] = value
+            data.move_to_end(key)
+        self._evict()
+
+    def _evict(self):
+        if self.maxsize is None:
+            return
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        """Drop all entries and reset the counters."""
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+        }
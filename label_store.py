@@ -0,0 +1,160 @@
+import sqlite3
+import numpy as np
+import pandas as pd
+
+# -----------------------------
+# Persistent cross-run label store (SQLite)
+# -----------------------------
+LABEL_STORE_VERSION = 1   # bump when the labeling code (not the rules) changes; wipes the store
+SQLITE_TIMEOUT = 30       # seconds to wait for another process's write lock (parallel workers)
+SQLITE_MAX_VARIABLES = 900
+
+
+def url_hashes(urls):
+    """Stable signed 64-bit hash per URL (SQLite INTEGER keys)."""
+    hashed = pd.util.hash_pandas_object(pd.Series(urls, dtype=object).astype(str), index=False)
+    return hashed.to_numpy().view(np.int64)
+
+
+class LabelStore:
+    """Category, normalized domain and search-query text per URL, kept across runs.
+
+    Tables:
+      - url_labels     url_hash -> category, domain, dom_clean, source, query
+      - domain_rules   dom_clean -> domain-level rules the URL labels were derived with
+      - meta           rule fingerprints the stored labels are valid for
+
+    `source` records which rule produced the category ('map', 'search', 'keyword',
+    'fallback' or 'rowwise'), so a rule change only invalidates the labels it can
+    affect (see sync). Invalidated URLs are relabeled the next time they are seen.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=SQLITE_TIMEOUT)
+        self.conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS url_labels (
+                url_hash  INTEGER PRIMARY KEY,
+                category  TEXT,
+                domain    TEXT,
+                dom_clean TEXT,
+                source    TEXT,
+                query     TEXT
+            );
+            CREATE INDEX IF NOT EXISTS url_labels_dom_clean ON url_labels (dom_clean);
+            CREATE TABLE IF NOT EXISTS domain_rules (
+                dom_clean    TEXT PRIMARY KEY,
+                map_category TEXT,
+                is_search    INTEGER,
+                fallback     TEXT
+            );
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        """)
+
+    def close(self):
+        self.conn.close()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM url_labels").fetchone()[0]
+
+    # ---- versioning ----
+    def _meta(self):
+        return dict(self.conn.execute("SELECT key, value FROM meta"))
+
+    def sync(self, fingerprints, domain_rules):
+        """Invalidate the labels that the current rules may label differently.
+
+        `fingerprints` has 'domain' (domain map + search engines), 'keyword' (KW_*
+        patterns) and 'prefix' (subdomain prefix) digests; `domain_rules(doms)`
+        returns the current (map category, is search, fallback) per cleaned domain.
+        - prefix or store version changed: everything is dropped
+        - keyword patterns changed: every label not decided by the domain map
+        - domain rules changed: labels of the domains whose rules changed, plus
+          row-wise labels
+        Returns the number of URL labels dropped.
+        """
+        meta = self._meta()
+        expected = {"version": str(LABEL_STORE_VERSION), **fingerprints}
+        if meta == expected:
+            return 0
+        before = len(self)
+        with self.conn:
+            if not meta:
+                pass
+            elif meta.get("version") != expected["version"] or meta.get("prefix") != expected["prefix"]:
+                self.conn.execute("DELETE FROM url_labels")
+                self.conn.execute("DELETE FROM domain_rules")
+            else:
+                if meta.get("keyword") != expected["keyword"]:
+                    self.conn.execute("DELETE FROM url_labels WHERE source != 'map'")
+                if meta.get("domain") != expected["domain"]:
+                    self._invalidate_domains(domain_rules)
+            self.conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", expected.items())
+        return before - len(self)
+
+    def _invalidate_domains(self, domain_rules):
+        stored = self.conn.execute("SELECT dom_clean, map_category, is_search, fallback FROM domain_rules").fetchall()
+        if stored:
+            doms = [row[0] for row in stored]
+            current = domain_rules(doms)
+            changed = [
+                (dom,) for dom, old, new in zip(doms, stored, current)
+                if (old[1], bool(old[2]), old[3]) != (new[0], bool(new[1]), new[2])
+            ]
+            self.conn.executemany("DELETE FROM url_labels WHERE dom_clean = ?", changed)
+            self.conn.executemany(
+                "UPDATE domain_rules SET map_category = ?, is_search = ?, fallback = ? WHERE dom_clean = ?",
+                [(new[0], int(bool(new[1])), new[2], dom) for dom, new in zip(doms, current)],
+            )
+        self.conn.execute("DELETE FROM url_labels WHERE source = 'rowwise'")
+
+    # ---- bulk access ----
+    def get_many(self, urls):
+        """Stored (category, domain) per URL, or None where the URL has no valid label."""
+        hashes = url_hashes(urls)
+        found = {}
+        for start in range(0, len(hashes), SQLITE_MAX_VARIABLES):
+            chunk = hashes[start:start + SQLITE_MAX_VARIABLES].tolist()
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT url_hash, category, domain FROM url_labels WHERE url_hash IN ({placeholders})", chunk
+            )
+            found.update((h, (cat, dom)) for h, cat, dom in rows)
+        return [found.get(h) for h in hashes.tolist()]
+
+    def put_many(self, urls, categories, domains, dom_clean, sources, queries, domain_rules):
+        """Insert or replace labels for `urls`, and the rules of any domain not stored yet."""
+        hashes = url_hashes(urls).tolist()
+        new_doms = sorted({d for d in dom_clean if d is not None})
+        with self.conn:
+            if new_doms:
+                known = set()
+                for start in range(0, len(new_doms), SQLITE_MAX_VARIABLES):
+                    chunk = new_doms[start:start + SQLITE_MAX_VARIABLES]
+                    placeholders = ",".join("?" * len(chunk))
+                    known.update(row[0] for row in self.conn.execute(
+                        f"SELECT dom_clean FROM domain_rules WHERE dom_clean IN ({placeholders})", chunk
+                    ))
+                missing = [d for d in new_doms if d not in known]
+                if missing:
+                    rules = domain_rules(missing)
+                    self.conn.executemany(
+                        "INSERT OR REPLACE INTO domain_rules VALUES (?, ?, ?, ?)",
+                        [(d, r[0], int(bool(r[1])), r[2]) for d, r in zip(missing, rules)],
+                    )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO url_labels VALUES (?, ?, ?, ?, ?, ?)",
+                zip(hashes, categories, domains, dom_clean, sources, queries),
+            )
+
+    def lookup(self, url):
+        """Full stored row for one URL as a dict (None if absent)."""
+        row = self.conn.execute(
+            "SELECT category, domain, dom_clean, source, query FROM url_labels WHERE url_hash = ?",
+            (int(url_hashes([url])[0]),),
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("category", "domain", "dom_clean", "source", "query"), row))
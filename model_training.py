@@ -0,0 +1,141 @@
+import time
+import pickle
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import SGDClassifier
+from sklearn.metrics import classification_report, confusion_matrix
+from feature_extraction import SessionFeatures, FEATURE_BATCH_SIZE, next_intent, matrix_bytes
+from instrumentation import stage, current_rss
+
+# -----------------------------
+# CONFIG: intent model
+# -----------------------------
+SGD_ALPHA = 1e-5      # L2 regularization strength
+TRAIN_EPOCHS = 3      # passes over the training batches
+TEST_FRACTION = 0.2   # latest sessions held out for evaluation
+
+
+def split_by_time(session_df, test_fraction=TEST_FRACTION):
+    """(train, test) session tables: the latest `test_fraction` of sessions by start time are the test set."""
+    cutoff = session_df['session_start'].quantile(1 - test_fraction)
+    is_test = session_df['session_start'] > cutoff
+    return session_df[~is_test], session_df[is_test]
+
+
+class IntentModel:
+    """Logistic regression (SGD, log loss) on SessionFeatures, trained out of core.
+
+    fit() streams the session table through SessionFeatures.iter_batches and calls
+    partial_fit on each sparse batch, so only one batch of features is in memory.
+    The class list is fixed up front (every category the rules can produce), which
+    partial_fit requires and which keeps shards trained separately compatible.
+    """
+
+    def __init__(self, features=None, alpha=SGD_ALPHA, seed=0):
+        self.features = features or SessionFeatures()
+        self.classes = np.asarray(self.features.categories, dtype=object)
+        self.clf = SGDClassifier(loss="log_loss", alpha=alpha, random_state=seed)
+        self.report = {}
+
+    # ---- training ----
+    def fit(self, session_df, target=None, epochs=TRAIN_EPOCHS, batch_size=FEATURE_BATCH_SIZE):
+        """Train on `session_df` (target defaults to next_intent) and return self.
+
+        self.report holds seconds spent building features and fitting, the rows
+        trained on, the largest feature batch in bytes, and RSS before / after.
+        """
+        target = next_intent(session_df) if target is None else target
+        report = {"feature_seconds": 0.0, "fit_seconds": 0.0, "rows": 0, "max_batch_bytes": 0,
+                  "rss_before_bytes": current_rss()}
+        for _ in range(epochs):
+            batches = self.features.iter_batches(session_df, target, batch_size)
+            while True:
+                t0 = time.perf_counter()
+                batch = next(batches, None)
+                report["feature_seconds"] += time.perf_counter() - t0
+                if batch is None:
+                    break
+                X, y = batch
+                t0 = time.perf_counter()
+                with stage("fit", rows=X.shape[0]):
+                    self.clf.partial_fit(X, y, classes=self.classes)
+                report["fit_seconds"] += time.perf_counter() - t0
+                report["rows"] += X.shape[0]
+                report["max_batch_bytes"] = max(report["max_batch_bytes"], matrix_bytes(X))
+        report["rss_after_bytes"] = current_rss()
+        self.report = report
+        print(f"✅ Intent model trained on {report['rows']:,} rows ({epochs} epochs): "
+              f"features {report['feature_seconds']:.2f}s, fit {report['fit_seconds']:.2f}s")
+        return self
+
+    # ---- scoring ----
+    def predict(self, session_df, batch_size=FEATURE_BATCH_SIZE):
+        """Predicted next-session category per session."""
+        preds = [self.clf.predict(X) for X, _ in self.features.iter_batches(session_df, batch_size=batch_size)]
+        return pd.Series(np.concatenate(preds) if preds else [], index=session_df.index, dtype=object)
+
+    def predict_proba(self, session_df, batch_size=FEATURE_BATCH_SIZE):
+        """Class probabilities per session (columns = self.clf.classes_)."""
+        probs = [self.clf.predict_proba(X) for X, _ in self.features.iter_batches(session_df, batch_size=batch_size)]
+        values = np.vstack(probs) if probs else np.empty((0, len(self.clf.classes_)))
+        return pd.DataFrame(values, index=session_df.index, columns=self.clf.classes_)
+
+    def predict_row(self, indices, values, partial_scores=None):
+        """Predicted category for one sparse row (SessionFeatures.row), without sklearn's input checks.
+
+        `partial_scores` adds the decision-function contribution of columns left out
+        of the row (see column_scores), e.g. hashed tokens scored as they arrive.
+        """
+        scores = self.clf.coef_[:, indices] @ values + self.clf.intercept_
+        if partial_scores is not None:
+            scores = scores + partial_scores
+        if len(scores) == 1:   # binary problem: one decision function
+            return self.clf.classes_[int(scores[0] > 0)]
+        return self.clf.classes_[scores.argmax()]
+
+    def column_scores(self, columns):
+        """Decision-function contribution of value 1.0 in each of `columns`, summed."""
+        return self.clf.coef_[:, columns].sum(axis=1)
+
+    def evaluate(self, session_df, target=None, batch_size=FEATURE_BATCH_SIZE):
+        """Classification report (dict) and confusion matrix on the sessions with a target."""
+        target = next_intent(session_df) if target is None else target
+        y_true, y_pred = [], []
+        for X, y in self.features.iter_batches(session_df, target, batch_size):
+            y_true.append(y)
+            y_pred.append(self.clf.predict(X))
+        y_true = np.concatenate(y_true) if y_true else np.array([], dtype=object)
+        y_pred = np.concatenate(y_pred) if y_pred else np.array([], dtype=object)
+        labels = [c for c in self.classes if c in set(y_true) | set(y_pred)]
+        report = classification_report(y_true, y_pred, labels=labels, output_dict=True, zero_division=0)
+        matrix = pd.DataFrame(confusion_matrix(y_true, y_pred, labels=labels), index=labels, columns=labels)
+        return report, matrix
+
+    # ---- persistence ----
+    def save(self, path):
+        with open(path, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(path):
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+
+def train_intent_model(session_df, test_fraction=TEST_FRACTION, epochs=TRAIN_EPOCHS, batch_size=FEATURE_BATCH_SIZE):
+    """Time-split `session_df`, train an IntentModel and print its held-out scores."""
+    target = next_intent(session_df)
+    train_df, test_df = split_by_time(session_df, test_fraction)
+    model = IntentModel().fit(train_df, target.loc[train_df.index], epochs=epochs, batch_size=batch_size)
+    report, _ = model.evaluate(test_df, target.loc[test_df.index], batch_size=batch_size)
+    if "accuracy" in report:
+        print(f"✅ Held-out accuracy {report['accuracy']:.3f}, macro F1 {report['macro avg']['f1-score']:.3f}")
+    return model, report
+
+
+if __name__ == "__main__":
+    from data_collection import DataCollection
+    from sessionization import Sessionization
+
+    session_df = Sessionization.sessionization(DataCollection.final_data(), lists=True)
+    train_intent_model(session_df)
@@ -0,0 +1,300 @@
+import json
+import asyncio
+import numpy as np
+import pandas as pd
+from sessionization import Sessionization
+from session_engine import DEFAULT_ENGINE
+from feature_extraction import domain_tokens, hash_token
+
+# -----------------------------
+# CONFIG: online service
+# -----------------------------
+ONLINE_HOST = "127.0.0.1"
+ONLINE_PORT = 8765
+BATCH_LABEL_MIN = 64   # micro-batches at least this large are labeled with one categorize_batch call
+
+
+class OpenSession:
+    """Running aggregates of one user's open session; every update is O(1) in the session length."""
+
+    __slots__ = ("user", "window_start", "session_id", "last_time", "min_time", "rows",
+                 "num_visits", "domains", "category_counts", "category_order", "dominant",
+                 "tokens", "token_scores")
+
+    def __init__(self, user, window_start, session_id, visit_time):
+        self.user = user
+        self.window_start = window_start
+        self.session_id = session_id
+        self.last_time = self.min_time = visit_time
+        self.rows = 0
+        self.num_visits = 0              # visits with a URL, like ('url', 'count') in the batch path
+        self.domains = set()
+        self.category_counts = {}
+        self.category_order = {}         # category -> order of first appearance (dominant tie-break)
+        self.dominant = None
+        self.tokens = set()              # distinct domain tokens (only tracked with a model)
+        self.token_scores = None         # model scores of the hashed token columns so far
+
+    def add(self, visit_time, category, domain, has_url):
+        """Fold one labeled visit; returns True when `domain` is new to the session."""
+        self.rows += 1
+        self.num_visits += has_url
+        if visit_time > self.last_time:
+            self.last_time = visit_time
+        if visit_time < self.min_time:
+            self.min_time = visit_time
+        new_domain = domain is not None and domain not in self.domains
+        if new_domain:
+            self.domains.add(domain)
+
+        # Dominant category: most visits, ties go to the category seen first in the session.
+        # Only `category` grew, so it is the only possible new leader.
+        counts = self.category_counts
+        n = counts[category] = counts.get(category, 0) + 1
+        order = self.category_order
+        if category not in order:
+            order[category] = len(order)
+        best = self.dominant
+        if best is None or n > counts[best] or (n == counts[best] and order[category] < order[best]):
+            self.dominant = category
+        return new_domain
+
+    def record(self):
+        """The session as a row of the session table (durations are added by closed_frame)."""
+        out = {
+            'user': self.user,
+            'session_id': self.session_id,
+            'session_start': self.min_time,
+            'session_end': self.last_time,
+            'num_visits': self.num_visits,
+            'unique_domains': len(self.domains),
+            'dominant_category': self.dominant,
+        }
+        out.update((category, count / self.rows) for category, count in self.category_counts.items())
+        return out
+
+
+class OnlineSessionizer:
+    """Sessionize live visits one at a time (or in micro-batches) with per-user open sessions.
+
+    Each user has at most one open session in memory. A visit is labeled through the
+    URL label cache (Sessionization.label_url), folded into its user's open session in
+    O(1), and answered with the session's current dominant category and, when an
+    IntentModel is given, the predicted next intent. A visit that falls outside the
+    open session (per the engine's window_start) closes it; expire(now) closes the
+    sessions that can no longer be extended. Closed sessions go to `on_close`
+    (default: kept in self.closed until drain()).
+
+    Visits older than the open session that do not belong to it are counted in
+    self.late and dropped. Overlapping engines are not supported, as in the
+    streaming and incremental modes.
+    """
+
+    def __init__(self, engine=None, model=None, on_close=None):
+        engine = engine or DEFAULT_ENGINE
+        if engine.overlapping:
+            raise ValueError("Online sessionization needs non-overlapping sessions.")
+        self.engine = engine
+        self.model = model
+        self.on_close = on_close
+        self.open = {}
+        self.closed = []
+        self.late = 0
+        self.watermark = None            # latest visit time seen (default "now" for expire)
+        freq = getattr(engine, "freq", None)
+        self._fixed_minutes = freq.total_seconds() / 60 if freq is not None else None
+
+    # ---- ingest ----
+    def add(self, user, url, visit_time):
+        """Fold one visit; returns {user, session_id, num_visits, dominant_category[, predicted_intent]}."""
+        category, domain = Sessionization.label_url(url)
+        return self._fold(user, url, pd.Timestamp(visit_time), category, domain)
+
+    def add_many(self, visits):
+        """Fold a micro-batch (DataFrame or iterable of dicts with user, url, visit_time) in order."""
+        visits = pd.DataFrame(visits, columns=['user', 'url', 'visit_time'])
+        if len(visits) >= BATCH_LABEL_MIN:
+            categories, domains = Sessionization.categorize_batch(visits['url'])
+        else:
+            labels = [Sessionization.label_url(url) for url in visits['url']]
+            categories, domains = [c for c, _ in labels], [d for _, d in labels]
+        times = pd.to_datetime(visits['visit_time'])
+        return [
+            self._fold(user, url, visit_time, category, domain)
+            for user, url, visit_time, category, domain
+            in zip(visits['user'], visits['url'], times, categories, domains)
+        ]
+
+    def _fold(self, user, url, visit_time, category, domain):
+        if self.watermark is None or visit_time > self.watermark:
+            self.watermark = visit_time
+        session = self.open.get(user)
+        if session is None:
+            session = self._open(user, visit_time, self.engine.window_start(visit_time))
+        else:
+            start = self.engine.window_start(visit_time, session.window_start, session.last_time)
+            if start != session.window_start:
+                if visit_time < session.last_time:
+                    self.late += 1
+                    return self._answer(session)
+                self._close(session)
+                session = self._open(user, visit_time, start)
+        if session.add(visit_time, category, domain, isinstance(url, str)) and self.model is not None:
+            self._score_tokens(session, domain)
+        return self._answer(session)
+
+    def _score_tokens(self, session, domain):
+        """Add the model scores of the domain's tokens not yet in the session (hashed block is additive)."""
+        new = domain_tokens((domain,)) - session.tokens
+        if not new:
+            return
+        session.tokens |= new
+        features = self.model.features
+        columns = [features.hash_offset + hash_token(token, features.n_hash) for token in new]
+        scores = self.model.column_scores(columns)
+        session.token_scores = scores if session.token_scores is None else session.token_scores + scores
+
+    def _open(self, user, visit_time, window_start):
+        session_id = f"{user}_{self.engine.label}_{window_start.strftime(self.engine.id_format)}"
+        session = self.open[user] = OpenSession(user, window_start, session_id, visit_time)
+        return session
+
+    def _answer(self, session):
+        answer = {
+            'user': session.user,
+            'session_id': session.session_id,
+            'num_visits': session.num_visits,
+            'dominant_category': session.dominant,
+        }
+        if self.model is not None and session.rows:
+            answer['predicted_intent'] = self.predict(session)
+        return answer
+
+    def predict(self, session):
+        """Predicted next intent for an open session, in O(#categories) from its running aggregates."""
+        observed = (session.last_time - session.min_time).total_seconds() / 60
+        indices, values = self.model.features.row(
+            session.category_counts, session.num_visits, len(session.domains), observed,
+            self._fixed_minutes if self._fixed_minutes is not None else observed,
+            session.min_time,
+        )
+        return self.model.predict_row(indices, values, session.token_scores)
+
+    # ---- closing ----
+    def _close(self, session):
+        del self.open[session.user]
+        record = session.record()
+        if self.on_close is not None:
+            self.on_close(record)
+        else:
+            self.closed.append(record)
+        return record
+
+    def expire(self, now=None):
+        """Close every open session a visit at `now` (default: the latest visit seen) could not extend.
+
+        Also re-checks the labeling rules, so rule edits reach URLs already in the label cache.
+        """
+        Sessionization._sync_rules()
+        now = self.watermark if now is None else pd.Timestamp(now)
+        if now is None:
+            return []
+        done = [s for s in self.open.values()
+                if self.engine.window_start(now, s.window_start, s.last_time) != s.window_start]
+        return [self._close(s) for s in done]
+
+    def flush(self):
+        """Close all open sessions."""
+        return [self._close(s) for s in list(self.open.values())]
+
+    def drain(self):
+        """Closed sessions collected so far as a session table (and forget them)."""
+        records, self.closed = self.closed, []
+        return self.closed_frame(records)
+
+    def closed_frame(self, records):
+        """Session table for closed-session records, with the batch path's columns and durations."""
+        if not records:
+            return pd.DataFrame(columns=[c for c in Sessionization.SESSION_COLUMNS if not c.endswith('_list')])
+        df = pd.DataFrame.from_records(records)
+        df['observed_span'] = df['session_end'] - df['session_start']
+        df['session_duration'] = None
+        df['duration_minutes_observed'] = df['observed_span'].dt.total_seconds() / 60
+        df['duration_minutes'] = None
+        self.engine.durations(df)
+        base = [c for c in Sessionization.SESSION_COLUMNS if c in df.columns]
+        props = [c for c in df.columns if c not in Sessionization.SESSION_COLUMNS]
+        df[props] = df[props].fillna(0)
+        return df[base + props]
+
+
+# -----------------------------
+# Local endpoint: newline-delimited JSON over TCP (asyncio)
+# -----------------------------
+# Requests, one JSON object per line:
+#   {"user": ..., "url": ..., "visit_time": ...}          one visit -> one answer
+#   {"op": "visits", "visits": [{...}, ...]}               micro-batch -> list of answers
+#   {"op": "expire", "now": ...} / {"op": "flush"}         -> closed session records
+# Each request gets exactly one JSON line back; failures come back as {"error": ...}.
+
+def handle_request(sessionizer, msg):
+    op = msg.get("op", "visit")
+    if op == "visit":
+        return sessionizer.add(msg["user"], msg.get("url"), msg["visit_time"])
+    if op == "visits":
+        return sessionizer.add_many(msg["visits"])
+    if op == "expire":
+        return sessionizer.expire(msg.get("now"))
+    if op == "flush":
+        return sessionizer.flush()
+    raise ValueError(f"Unknown op {op!r}; expected 'visit', 'visits', 'expire' or 'flush'.")
+
+
+async def serve(sessionizer, host=ONLINE_HOST, port=ONLINE_PORT):
+    """Start the endpoint; returns the asyncio server (use `async with` or serve_forever())."""
+    async def client(reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    out = handle_request(sessionizer, json.loads(line))
+                except Exception as e:  # report to the client, keep the connection
+                    out = {"error": f"{type(e).__name__}: {e}"}
+                writer.write(json.dumps(out, default=_json_default).encode("utf-8") + b"\n")
+                await writer.drain()
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(client, host, port)
+
+
+def _json_default(value):
+    if isinstance(value, (pd.Timestamp, pd.Timedelta)):
+        return str(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+async def _main(host, port, model_path):
+    model = None
+    if model_path:
+        from model_training import IntentModel
+        model = IntentModel.load(model_path)
+    server = await serve(OnlineSessionizer(model=model), host, port)
+    print(f"✅ Online sessionizer listening on {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Online sessionization endpoint (newline-delimited JSON).")
+    parser.add_argument("--host", default=ONLINE_HOST)
+    parser.add_argument("--port", type=int, default=ONLINE_PORT)
+    parser.add_argument("--model", help="IntentModel pickle (IntentModel.save) for predicted_intent")
+    args = parser.parse_args()
+    asyncio.run(_main(args.host, args.port, args.model))
@@ -0,0 +1,53 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import data_collection
+from data_collection import DataCollection
+from sessionization import Sessionization
+
+# -----------------------------
+# CONFIG: parallel execution
+# -----------------------------
+PARALLEL_WORKERS = None   # None = one worker per CPU core
+
+# -----------------------------
+# Per-user worker (module level so it pickles into worker processes)
+# -----------------------------
+def _sessionize_user(task):
+    """Load, label and sessionize a single user file."""
+    user_label, path, lists, engine = task
+    df = DataCollection.load_and_prep(path, user_label)
+    df = df.sort_values('visit_time', kind='stable').reset_index(drop=True)
+    Sessionization.assign_sessions(df, engine)
+    Sessionization.label_visits(df)
+    return Sessionization.aggregate_sessions(df, lists=lists, engine=engine)
+
+
+class ParallelPipeline:
+    """Shard the pipeline by user across a process pool.
+
+    Sessions never span users (session_id is prefixed with the user), so every
+    user file is loaded, labeled and aggregated independently and the parent
+    only concatenates the per-user session tables. Users are processed and
+    merged in sorted order, so the output does not depend on the worker count
+    or on scheduling.
+    """
+
+    @staticmethod
+    def run(files=None, workers=None, lists=False, engine=None):
+        """Session table for every user in `files` (default: data_collection.user_files)."""
+        files = files if files is not None else data_collection.user_files
+        workers = workers or PARALLEL_WORKERS or os.cpu_count() or 1
+        tasks = [(user_label, files[user_label], lists, engine) for user_label in sorted(files)]
+        if not tasks:
+            raise ValueError("No user files to process.")
+
+        if workers == 1 or len(tasks) == 1:
+            pieces = [_sessionize_user(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+                # map() yields results in task order regardless of completion order
+                pieces = list(pool.map(_sessionize_user, tasks, chunksize=1))
+
+        session_df = Sessionization.combine_sessions(pieces)
+        print(f"✅ Parallel sessionization complete: {len(tasks)} users, {workers} workers.")
+        return session_df
@@ -0,0 +1,192 @@
+import numpy as np
+import pandas as pd
+
+# -----------------------------
+# Pluggable session engines
+# -----------------------------
+# An engine decides which session(s) each visit belongs to:
+#   assign(df, compact)   adds the window-start column and session_id (or, with compact=True, the
+#                         int64 session_key) to the visits frame (in place)
+#   expand(df)            one row per (visit, session) pair; only overlapping windows repeat visits
+#   durations(summary)    session_duration (Timedelta) and duration_minutes for the session table
+#   window_start(t, open_start, last_time)
+#                         (non-overlapping engines) window start of the session a single visit at
+#                         `t` falls in, given the user's open session; equal to open_start when
+#                         the visit extends it. Used by the online sessionizer.
+# Engines with overlapping=True (sliding windows) can't be used by streaming/incremental modes,
+# which assume every visit belongs to exactly one session and sessions are contiguous in time.
+
+
+def _format_ids(users, starts, label, fmt):
+    """user + "_<label>_" + start.strftime(fmt), calling strftime once per distinct start."""
+    codes, uniques = pd.factorize(pd.DatetimeIndex(starts))
+    formatted = np.append(uniques.strftime(fmt).to_numpy(dtype=object), np.nan)  # code -1 = NaT
+    users = pd.Series(np.asarray(users, dtype=object)).astype(str)
+    return (users + f"_{label}_" + pd.Series(formatted[codes])).to_numpy(dtype=object)
+
+
+def session_keys(users, starts):
+    """int64 session keys ordered like (user, session_id): user rank * 2**32 + window start in epoch seconds.
+
+    Keys are -1 where the user or the start is missing. Window starts are kept to the
+    second, which is the resolution of every engine's session_id format.
+    """
+    users = pd.Series(users).reset_index(drop=True)
+    if isinstance(users.dtype, pd.CategoricalDtype):
+        # rank categories as strings so keys sort like the formatted session_ids
+        rank = users.cat.categories.astype(str).argsort().argsort()
+        codes = users.cat.codes.to_numpy()
+        user_rank = np.where(codes >= 0, rank[codes], -1)
+    else:
+        user_rank = pd.factorize(users, sort=True)[0]
+    starts = pd.DatetimeIndex(starts)
+    keys = user_rank.astype(np.int64) * (1 << 32) + starts.asi8 // 1_000_000_000
+    keys[(user_rank < 0) | starts.isna()] = -1
+    return keys
+
+
+def format_session_keys(users, keys, engine):
+    """session_id strings for `keys` produced by session_keys (only needed on output)."""
+    starts = pd.to_datetime(np.asarray(keys, dtype=np.int64) % (1 << 32), unit="s")
+    return _format_ids(users, starts, engine.label, engine.id_format)
+
+
+def _label_sessions(df, engine, compact):
+    if compact:
+        df['session_key'] = session_keys(df['user'], df[engine.window_column])
+    else:
+        df['session_id'] = _format_ids(df['user'], df[engine.window_column], engine.label, engine.id_format)
+
+
+class FixedWindowEngine:
+    """Fixed, non-overlapping windows aligned to the clock (default: 1-hour buckets)."""
+
+    overlapping = False
+
+    def __init__(self, freq="h"):
+        self.freq = pd.Timedelta(pd.tseries.frequencies.to_offset(freq)).as_unit("ns")
+        hourly = self.freq == pd.Timedelta(hours=1)
+        self.window_column = "session_start_hour" if hourly else "session_window_start"
+        self.label = "hour" if hourly else "win"
+        self.id_format = "%Y%m%d%H" if hourly else "%Y%m%d%H%M"
+
+    def assign(self, df, compact=False):
+        df[self.window_column] = df['visit_time'].dt.floor(self.freq)
+        _label_sessions(df, self, compact)
+        return df
+
+    def expand(self, df):
+        return df
+
+    def window_start(self, visit_time, open_start=None, last_time=None):
+        return visit_time.floor(self.freq)
+
+    def durations(self, summary):
+        summary['session_duration'] = self.freq
+        minutes = self.freq.total_seconds() / 60
+        summary['duration_minutes'] = int(minutes) if minutes.is_integer() else minutes
+        return summary
+
+
+class GapEngine:
+    """Inactivity-gap sessions: a new session starts after `gap_minutes` without a visit.
+
+    Computed in O(n) with diff/cumsum over visits sorted by user and visit_time;
+    unsorted input is sorted once and the result scattered back. The session_id
+    carries the session's first visit time, so it does not change when later
+    visits extend the session.
+    """
+
+    overlapping = False
+    window_column = "session_window_start"
+    label = "gap"
+    id_format = "%Y%m%d%H%M%S"
+
+    def __init__(self, gap_minutes=30):
+        self.gap = pd.Timedelta(minutes=gap_minutes)
+
+    def assign(self, df, compact=False):
+        user_codes = pd.factorize(df['user'])[0]
+        times = df['visit_time'].to_numpy()
+        order = None
+        same_user = user_codes[1:] == user_codes[:-1]
+        # sorted = each user is one contiguous block and times never decrease inside it
+        is_sorted = (
+            (~same_user).sum() == user_codes.max(initial=0)
+            and bool((times[1:][same_user] >= times[:-1][same_user]).all())
+        )
+        if not is_sorted:
+            order = np.lexsort((times, user_codes))
+            user_codes, times = user_codes[order], times[order]
+            same_user = user_codes[1:] == user_codes[:-1]
+
+        new_session = np.ones(len(times), dtype=bool)
+        new_session[1:] = ~same_user | ((times[1:] - times[:-1]) > self.gap.to_timedelta64())
+        session_idx = np.cumsum(new_session) - 1
+        starts = times[new_session][session_idx]
+        if order is not None:
+            unsorted = np.empty_like(starts)
+            unsorted[order] = starts
+            starts = unsorted
+
+        df[self.window_column] = starts
+        _label_sessions(df, self, compact)
+        return df
+
+    def expand(self, df):
+        return df
+
+    def window_start(self, visit_time, open_start=None, last_time=None):
+        if open_start is not None and visit_time - last_time <= self.gap:
+            return open_start
+        return visit_time
+
+    def durations(self, summary):
+        summary['session_duration'] = summary['observed_span']
+        summary['duration_minutes'] = summary['duration_minutes_observed']
+        return summary
+
+
+class SlidingWindowEngine:
+    """Overlapping windows of length `window` starting every `step` (clock-aligned).
+
+    Each visit belongs to every window that contains it, so expand() repeats a
+    visit ceil(window / step) times at most.
+    """
+
+    overlapping = True
+    window_column = "session_window_start"
+    label = "win"
+    id_format = "%Y%m%d%H%M"
+
+    def __init__(self, window="h", step="15min"):
+        self.window = pd.Timedelta(pd.tseries.frequencies.to_offset(window)).as_unit("ns")
+        self.step = pd.Timedelta(pd.tseries.frequencies.to_offset(step)).as_unit("ns")
+        if self.step <= pd.Timedelta(0) or self.step > self.window:
+            raise ValueError("SlidingWindowEngine needs 0 < step <= window.")
+
+    def assign(self, df, compact=False):
+        # Latest window containing each visit; expand() adds the earlier overlapping ones
+        df[self.window_column] = df['visit_time'].dt.floor(self.step)
+        _label_sessions(df, self, compact)
+        return df
+
+    def expand(self, df):
+        per_visit = int(np.ceil(self.window / self.step))
+        expanded = df.iloc[np.repeat(np.arange(len(df)), per_visit)].copy()
+        lag = np.tile(np.arange(per_visit), len(df)) * self.step.to_timedelta64()
+        starts = expanded['visit_time'].dt.floor(self.step).to_numpy() - lag
+        keep = starts > (expanded['visit_time'].to_numpy() - self.window.to_timedelta64())
+        expanded = expanded[keep]
+        expanded[self.window_column] = starts[keep]
+        _label_sessions(expanded, self, compact='session_key' in expanded.columns)
+        return expanded.reset_index(drop=True)
+
+    def durations(self, summary):
+        summary['session_duration'] = self.window
+        minutes = self.window.total_seconds() / 60
+        summary['duration_minutes'] = int(minutes) if minutes.is_integer() else minutes
+        return summary
+
+
+DEFAULT_ENGINE = FixedWindowEngine()
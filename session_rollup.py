@@ -0,0 +1,160 @@
+import os
+import numpy as np
+import pandas as pd
+
+# -----------------------------
+# Session rollup cube for EDA / dashboards
+# -----------------------------
+TOP_K_DOMAINS = 100       # domain visit counts kept for "top domains" charts
+SAMPLE_SIZE = 5_000       # sessions kept for scatter plots
+ROLLUP_MEASURES = ('num_visits', 'unique_domains', 'duration_minutes_observed', 'duration_minutes')
+ROLLUP_PARTS = ('cube', 'top_domains', 'box_stats', 'correlation', 'sample')
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+class SessionRollup:
+    """Small precomputed aggregates of the session table and the labeled visits.
+
+    Built in one pass over each input and saved as a single pickle (build(parts=...)
+    computes only some of the tables; the others are None):
+      - cube          user x hour x weekday x dominant_category: session count and
+                      sums of ROLLUP_MEASURES (any count/sum/mean chart is a
+                      groupby over this table)
+      - top_domains   the TOP_K_DOMAINS most visited domains with visit counts
+      - box_stats     per-category quartiles and whiskers of num_visits and
+                      duration_minutes_observed (drawn with Axes.bxp)
+      - correlation   Pearson correlation of ROLLUP_MEASURES over all sessions
+      - sample        a seeded random sample of SAMPLE_SIZE sessions for scatter plots
+    """
+
+    def __init__(self, cube, top_domains, box_stats, correlation, sample):
+        self.cube = cube
+        self.top_domains = top_domains
+        self.box_stats = box_stats
+        self.correlation = correlation
+        self.sample = sample
+
+    # ---- build ----
+    @staticmethod
+    def build(session_df, visits_df=None, top_k=TOP_K_DOMAINS, sample_size=SAMPLE_SIZE, seed=0, parts=ROLLUP_PARTS):
+        """Rollup of `session_df` (and of the visits' domains when `visits_df` is given)."""
+        unknown = set(parts) - set(ROLLUP_PARTS)
+        if unknown:
+            raise ValueError(f"Unknown rollup parts {sorted(unknown)}; expected some of {ROLLUP_PARTS}.")
+        measures = list(ROLLUP_MEASURES)
+        cube = top_domains = box_stats = correlation = sample = None
+        if 'cube' in parts:
+            cube = SessionRollup._cube(session_df, measures)
+        if 'top_domains' in parts:
+            top_domains = SessionRollup._top_domains(visits_df, top_k)
+        if 'box_stats' in parts:
+            box_stats = SessionRollup._box_stats(session_df, ['num_visits', 'duration_minutes_observed'])
+        if 'correlation' in parts:
+            correlation = session_df[measures].corr()
+        if 'sample' in parts:
+            sample = SessionRollup._sample(session_df, measures, sample_size, seed)
+        return SessionRollup(cube, top_domains, box_stats, correlation, sample)
+
+    @staticmethod
+    def _cube(session_df, measures):
+        start = session_df['session_start']
+        keys = [
+            session_df['user'].rename('user'),
+            start.dt.hour.rename('hour'),
+            start.dt.dayofweek.rename('weekday'),
+            session_df['dominant_category'].rename('dominant_category'),
+        ]
+        grouped = session_df[measures].groupby(keys, sort=True, observed=True)
+        cube = grouped.sum()
+        cube.insert(0, 'sessions', grouped.size())
+        return cube.reset_index()
+
+    @staticmethod
+    def _top_domains(visits_df, top_k):
+        if visits_df is None:
+            return pd.DataFrame({'domain': pd.Series(dtype=object), 'visits': pd.Series(dtype='int64')})
+        top_domains = visits_df['domain'].value_counts().head(top_k)
+        return top_domains.rename_axis('domain').rename('visits').reset_index()
+
+    @staticmethod
+    def _sample(session_df, measures, sample_size, seed):
+        sample = session_df[['user', 'session_start', 'dominant_category', *measures]]
+        if len(sample) > sample_size:
+            sample = sample.sample(n=sample_size, random_state=seed).sort_index()
+        return sample.reset_index(drop=True)
+
+    @staticmethod
+    def _box_stats(session_df, columns):
+        """Quartiles and 1.5*IQR whiskers per (column, dominant_category), as Axes.bxp expects."""
+        rows = []
+        for category, group in session_df.groupby('dominant_category', sort=False, observed=True):
+            for col in columns:
+                x = group[col].dropna().to_numpy(dtype=float)
+                if not len(x):
+                    continue
+                q1, med, q3 = np.percentile(x, [25, 50, 75])
+                iqr = q3 - q1
+                rows.append({
+                    'column': col,
+                    'dominant_category': category,
+                    'count': len(x),
+                    'mean': x.mean(),
+                    'q1': q1,
+                    'med': med,
+                    'q3': q3,
+                    'whislo': x[x >= q1 - 1.5 * iqr].min(),
+                    'whishi': x[x <= q3 + 1.5 * iqr].max(),
+                })
+        return pd.DataFrame(rows)
+
+    # ---- persistence ----
+    def save(self, path):
+        """Write all tables to `path` (temp file swapped in, so readers never see half a rollup)."""
+        tmp = path + ".tmp"
+        pd.to_pickle(self.__dict__, tmp)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def load(path):
+        return SessionRollup(**pd.read_pickle(path))
+
+    # ---- queries used by the plots ----
+    def filter(self, users=None):
+        """Cube rows for `users` (all users by default)."""
+        if users is None:
+            return self.cube
+        return self.cube[self.cube['user'].isin(list(users))]
+
+    def category_counts(self, users=None):
+        """Sessions per dominant category, most frequent first."""
+        counts = self.filter(users).groupby('dominant_category', sort=False)['sessions'].sum()
+        return counts.sort_values(ascending=False, kind='stable')
+
+    def category_means(self, measure, users=None):
+        """Mean of `measure` per session, by dominant category."""
+        sums = self.filter(users).groupby('dominant_category', sort=False)[['sessions', measure]].sum()
+        return sums[measure] / sums['sessions']
+
+    def counts_by(self, by, users=None):
+        """Sessions per value of `by` ('hour', 'weekday', 'user', ...); weekday is 0=Monday."""
+        return self.filter(users).groupby(by)['sessions'].sum()
+
+    def crosstab(self, index, columns, users=None):
+        """Session counts with `index` rows and `columns` columns (missing cells are 0)."""
+        return self.filter(users).pivot_table(
+            index=index, columns=columns, values='sessions', aggfunc='sum', fill_value=0
+        )
+
+    def box_stats_for(self, column, order):
+        """List of Axes.bxp stat dicts for `column`, one per category in `order` that has data."""
+        stats = self.box_stats[self.box_stats['column'] == column].set_index('dominant_category')
+        out = []
+        for category in order:
+            if category in stats.index:
+                row = stats.loc[category]
+                out.append({
+                    'label': category, 'mean': row['mean'], 'med': row['med'],
+                    'q1': row['q1'], 'q3': row['q3'],
+                    'whislo': row['whislo'], 'whishi': row['whishi'], 'fliers': [],
+                })
+        return out
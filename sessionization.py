@@ -1,14 +1,22 @@
 import re
+import hashlib
+import numpy as np
 import pandas as pd
-from collections import Counter
 from data_collection import DataCollection
-from urllib.parse import urlparse, parse_qs
+from domain_index import DomainIndex, DomainMap
+from keyword_matcher import KeywordMatcher
+from label_cache import LabelCache
+from label_store import LabelStore
+from url_parts import parse_url, search_query
+from session_engine import DEFAULT_ENGINE, format_session_keys
+from compact_frame import compact_visits, new_dictionaries
+from instrumentation import stage, cache_delta
 
 class Sessionization:
     # -----------------------------------------
     # Default domain-category map
     # -----------------------------------------
-    DEFAULT_DOMAIN_MAP = {
+    DEFAULT_DOMAIN_MAP = DomainMap({
         # Education / Career
         "coursera.org": "Education/Career", "edx.org": "Education/Career", "mit.edu": "Education/Career",
         "wikipedia.org": "Education/Career", "arxiv.org": "Education/Career",
@@ -32,7 +40,7 @@ class Sessionization:
         # Travel
         "airbnb.com": "Travel", "booking.com": "Travel", "expedia.com": "Travel", "tripadvisor.com": "Travel",
         "uber.com": "Travel", "lyft.com": "Travel", "airindia.com": "Travel"
-    }
+    })
     DEFAULT_DOMAIN_MAP.update({
         # --- Reassigned Education/Career ---
         "placementdriveinsta.com": "Education/Career",
@@ -75,36 +83,103 @@ class Sessionization:
     KW_MISC = r"(login|settings|help|support|cdn|static|ads|analytics|localhost)"
 
     SEARCH_ENGINES = ("google.", "bing.", "yahoo.", "duckduckgo.", "baidu.", "yandex.")
+    SUBDOMAIN_PREFIX = r"^(web|mail|m|news|blog|app|en|home)\."
+
+    # Well-formed absolute URL: printable ASCII, valid scheme, bracket-free netloc and no ';' params in the path.
+    # These parse identically with the regex and with urlparse; anything else takes the row-wise path.
+    BATCH_URL_PATTERN = (
+        r"^(?=[!-~]*$)[A-Za-z][A-Za-z0-9+.\-]*://"
+        r"(?P<netloc>[^/?#\[\]]*)(?P<path>(?:/[^?#;]*)?)(?:\?(?P<query>[^#]*))?(?:#.*)?$"
+    )
+
+    # Compiled lookup for DEFAULT_DOMAIN_MAP, rebuilt when the map is replaced or edited
+    _domain_index = None
+    _domain_index_key = None
+
+    # Compiled single-pass matcher for the KW_* patterns (priority = order below)
+    _keyword_matcher = None
+
+    # LRU label caches: URL -> (category, domain) and cleaned domain -> domain-level rules
+    URL_CACHE_SIZE = 500_000
+    DOMAIN_CACHE_SIZE = 100_000
+    _url_cache = LabelCache(URL_CACHE_SIZE)
+    _domain_cache = LabelCache(DOMAIN_CACHE_SIZE)
+    _rules_fingerprint = None
+    _rules_key_seen = None
+
+    # Persistent label store shared across runs (SQLite file); None disables it
+    LABEL_STORE_PATH = None
+    _label_store = None
 
     # -----------------------------------------
     # Helper Functions
     # -----------------------------------------
+    @staticmethod
+    def get_domain_index():
+        """Return the DomainIndex compiled from DEFAULT_DOMAIN_MAP (rebuilt when it is replaced or edited)."""
+        domain_map = Sessionization.domain_map()
+        key = (id(domain_map), domain_map.version)
+        if Sessionization._domain_index is None or Sessionization._domain_index_key != key:
+            Sessionization._domain_index = DomainIndex(domain_map)
+            Sessionization._domain_index_key = key
+        return Sessionization._domain_index
+
+    @staticmethod
+    def domain_map():
+        """DEFAULT_DOMAIN_MAP as a DomainMap; a plain dict assigned to it is adopted (copied) first."""
+        domain_map = Sessionization.DEFAULT_DOMAIN_MAP
+        if not isinstance(domain_map, DomainMap):
+            domain_map = Sessionization.DEFAULT_DOMAIN_MAP = DomainMap(domain_map)
+        return domain_map
+
+    @staticmethod
+    def get_keyword_matcher():
+        """Return the KeywordMatcher for the KW_* patterns, rebuilt when a pattern changes."""
+        patterns = (
+            ("Education/Career", Sessionization.KW_EDU),
+            ("Social/Entertainment", Sessionization.KW_SOCIAL),
+            ("Shopping", Sessionization.KW_SHOP),
+            ("Finance", Sessionization.KW_FIN),
+            ("Travel", Sessionization.KW_TRAVEL),
+        )
+        matcher = Sessionization._keyword_matcher
+        if matcher is None or matcher.patterns != patterns:
+            matcher = Sessionization._keyword_matcher = KeywordMatcher(patterns)
+        return matcher
+
+    @staticmethod
+    def reset_domain_index():
+        """Drop the compiled index (it is rebuilt on the next lookup)."""
+        Sessionization._domain_index = None
+        Sessionization._domain_index_key = None
+
     @staticmethod
     def extract_search_query_from_url(url):
         """Extract search query if the URL is from a search engine."""
         try:
-            parsed = urlparse(url or "")
-            netloc = (parsed.netloc or "").lower()
-            if any(s in netloc for s in Sessionization.SEARCH_ENGINES):
-                qs = parse_qs(parsed.query)
-                for k in ("q", "query", "p", "search"):
-                    if k in qs and qs[k]:
-                        return " ".join(qs[k]).lower()
-                path_tokens = parsed.path.replace("/", " ").lower()
-                return path_tokens.strip()
+            parts = parse_url(url or "")
+            netloc = (parts.netloc or "").lower()
+            if parts.netloc is not None and any(s in netloc for s in Sessionization.SEARCH_ENGINES):
+                return Sessionization._search_text(parts.query, parts.path)
         except Exception:
             pass
         return None
 
+    @staticmethod
+    def _search_text(query, path):
+        """Search text of a search-engine URL: the q/query/p/search value, else the path tokens."""
+        text = search_query(query)
+        if text is not None:
+            return text.lower()
+        return path.replace("/", " ").lower().strip()
+
     @staticmethod
     def normalize_domain(url_or_domain):
         """Return clean base domain."""
         try:
-            p = urlparse(url_or_domain if "://" in url_or_domain else "http://" + url_or_domain)
-            dom = p.netloc.lower()
-            if dom.startswith("www."):
-                dom = dom[4:]
-            dom = dom.split(":")[0]
+            dom = parse_url(url_or_domain).domain
+            if dom is None:
+                raise ValueError(url_or_domain)
             return dom
         except Exception:
             return (url_or_domain or "").lower()
@@ -117,109 +192,543 @@ class Sessionization:
 
         url = str(url).strip()
         dom = Sessionization.normalize_domain(url)
-        dom_clean = re.sub(r"^(web|mail|m|news|blog|app|en|home)\.", "", dom)
+        dom_clean = re.sub(Sessionization.SUBDOMAIN_PREFIX, "", dom)
 
-        # 1️⃣ Domain-level lookup (subdomain-aware)
-        for known_domain, cat in Sessionization.DEFAULT_DOMAIN_MAP.items():
-            if known_domain in dom_clean:
-                return cat
+        # 1️⃣ Domain-level lookup (subdomain-aware, first map entry contained in the domain wins)
+        cat = Sessionization.get_domain_index().lookup(dom_clean)
+        if cat is not None:
+            return cat
 
         # 2️⃣ Handle Google and other search engine URLs
         if any(se in dom_clean for se in Sessionization.SEARCH_ENGINES):
             query_text = Sessionization.extract_search_query_from_url(url)
             if query_text:
                 q = query_text.lower()
-                if re.search(Sessionization.KW_EDU, q):
-                    return "Education/Career"
-                if re.search(Sessionization.KW_SOCIAL, q):
-                    return "Social/Entertainment"
-                if re.search(Sessionization.KW_SHOP, q):
-                    return "Shopping"
-                if re.search(Sessionization.KW_FIN, q):
-                    return "Finance"
-                if re.search(Sessionization.KW_TRAVEL, q):
-                    return "Travel"
+                cat = Sessionization.get_keyword_matcher().match(q)
+                if cat is not None:
+                    return cat
                 # if no intent keyword match
                 return "General Search"
             else:
                 return "General Search"
 
         # 3️⃣ Combined domain + path tokens (non-search engines)
-        parsed = urlparse(url)
+        parsed = parse_url(url)
+        if parsed.netloc is None:
+            raise ValueError(f"Invalid URL: {url!r}")
         combined = " ".join(filter(None, [dom_clean, parsed.path.replace("/", " "), parsed.query])).lower()
-        if re.search(Sessionization.KW_EDU, combined):
-            return "Education/Career"
-        if re.search(Sessionization.KW_SOCIAL, combined):
-            return "Social/Entertainment"
-        if re.search(Sessionization.KW_SHOP, combined):
-            return "Shopping"
-        if re.search(Sessionization.KW_FIN, combined):
-            return "Finance"
-        if re.search(Sessionization.KW_TRAVEL, combined):
-            return "Travel"
+        cat = Sessionization.get_keyword_matcher().match(combined)
+        if cat is not None:
+            return cat
+
+        # 4️⃣ Heuristics for generic domain names + 5️⃣ default fallback
+        return Sessionization.sld_category(dom_clean)
 
-        # 4️⃣ Heuristics for generic domain names
+    @staticmethod
+    def sld_category(dom_clean):
+        """Fallback category from the second-level label of a cleaned domain."""
         sld = dom_clean.split(".")[-2] if len(dom_clean.split(".")) >= 2 else dom_clean
         if sld in ("blog", "news", "press", "media"):
             return "Social/Entertainment"
         if sld in ("shop", "store", "deal", "promo"):
             return "Shopping"
-
-        # 5️⃣ Default fallback
         return "Miscellaneous"
 
+    # -----------------------------------------
+    # Batch Categorization
+    # -----------------------------------------
+    @staticmethod
+    def keyword_category_series(texts, default):
+        """Vectorized KW_* matching in priority order; rows without a match get `default`."""
+        return Sessionization.get_keyword_matcher().match_series(texts, default)
+
+    @staticmethod
+    def _join_nonempty(left, right):
+        """Element-wise " ".join(filter(None, [left, right])) for two string Series."""
+        joined = left + " " + right
+        joined = joined.where(right != "", left)
+        return joined.where(left != "", right)
+
+    @staticmethod
+    def _normalize_domain_or_none(url):
+        try:
+            return Sessionization.normalize_domain(url)
+        except Exception:
+            return None
+
+    @staticmethod
+    def _rules():
+        """Everything the labels depend on (domain map, KW_* patterns, search engines, prefix) as a tuple."""
+        return (
+            tuple(Sessionization.DEFAULT_DOMAIN_MAP.items()),
+            Sessionization.KW_EDU, Sessionization.KW_SOCIAL, Sessionization.KW_SHOP,
+            Sessionization.KW_FIN, Sessionization.KW_TRAVEL,
+            tuple(Sessionization.SEARCH_ENGINES), Sessionization.SUBDOMAIN_PREFIX,
+        )
+
+    @staticmethod
+    def _rules_key():
+        """O(1) stand-in for _rules(): equal keys mean unchanged rules (the map is checked by version)."""
+        domain_map = Sessionization.domain_map()
+        return (
+            id(domain_map), domain_map.version,
+            Sessionization.KW_EDU, Sessionization.KW_SOCIAL, Sessionization.KW_SHOP,
+            Sessionization.KW_FIN, Sessionization.KW_TRAVEL,
+            tuple(Sessionization.SEARCH_ENGINES), Sessionization.SUBDOMAIN_PREFIX,
+        )
+
+    @staticmethod
+    def rules_fingerprint():
+        """Stable digest of everything the labels depend on (domain map, KW_* patterns, search engines)."""
+        return hashlib.sha1(repr(Sessionization._rules()).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def rules_fingerprints():
+        """Separate digests of the domain-level rules, the KW_* patterns and the subdomain prefix."""
+        def digest(rules):
+            return hashlib.sha1(repr(rules).encode("utf-8")).hexdigest()
+        return {
+            "domain": digest((tuple(Sessionization.DEFAULT_DOMAIN_MAP.items()), Sessionization.SEARCH_ENGINES)),
+            "keyword": digest((
+                Sessionization.KW_EDU, Sessionization.KW_SOCIAL, Sessionization.KW_SHOP,
+                Sessionization.KW_FIN, Sessionization.KW_TRAVEL,
+            )),
+            "prefix": digest(Sessionization.SUBDOMAIN_PREFIX),
+        }
+
+    @staticmethod
+    def _sync_rules():
+        """Invalidate caches and the compiled index when the labeling rules changed.
+
+        Unchanged rules are detected from _rules_key() in O(1), independent of the
+        map size, so per-visit callers can check on every call; the fingerprint is
+        only recomputed after an edit.
+        """
+        key = Sessionization._rules_key()
+        if key == Sessionization._rules_key_seen:
+            return
+        Sessionization._rules_key_seen = key
+        fingerprint = Sessionization.rules_fingerprint()
+        if fingerprint != Sessionization._rules_fingerprint:
+            Sessionization._url_cache.clear()
+            Sessionization._domain_cache.clear()
+            Sessionization.reset_domain_index()
+            Sessionization._rules_fingerprint = fingerprint
+            if Sessionization._label_store is not None:
+                Sessionization._sync_label_store()
+
+    @staticmethod
+    def _sync_label_store():
+        dropped = Sessionization._label_store.sync(
+            Sessionization.rules_fingerprints(), Sessionization._domain_rules
+        )
+        if dropped:
+            print(f"ℹ️ Label store: {dropped} labels invalidated by rule changes, they will be relabeled.")
+
+    @staticmethod
+    def open_label_store(path=None):
+        """Use the persistent LabelStore at `path` (default LABEL_STORE_PATH) in categorize_batch."""
+        Sessionization.close_label_store()
+        Sessionization._sync_rules()   # the store is synced through _domain_rules: no stale cached rules
+        path = path or Sessionization.LABEL_STORE_PATH
+        Sessionization._label_store = LabelStore(path)
+        Sessionization._sync_label_store()
+        return Sessionization._label_store
+
+    @staticmethod
+    def close_label_store():
+        if Sessionization._label_store is not None:
+            Sessionization._label_store.close()
+            Sessionization._label_store = None
+
+    @staticmethod
+    def get_label_store():
+        """The open LabelStore, opening LABEL_STORE_PATH on first use (None when not configured)."""
+        if Sessionization._label_store is None and Sessionization.LABEL_STORE_PATH:
+            Sessionization.open_label_store()
+        return Sessionization._label_store
+
+    @staticmethod
+    def configure_cache(url_cache_size=None, domain_cache_size=None):
+        """Resize the label caches (None keeps the current bound)."""
+        if url_cache_size is not None:
+            Sessionization._url_cache = LabelCache(url_cache_size)
+        if domain_cache_size is not None:
+            Sessionization._domain_cache = LabelCache(domain_cache_size)
+
+    @staticmethod
+    def cache_stats():
+        """Hit/miss counters of the URL and domain label caches."""
+        return {
+            "url": Sessionization._url_cache.stats(),
+            "domain": Sessionization._domain_cache.stats(),
+        }
+
+    @staticmethod
+    def _domain_rules(dom_clean):
+        """Per distinct cleaned domain: (map category or None, is search engine, heuristic fallback)."""
+        cache = Sessionization._domain_cache
+        keys = list(dom_clean)
+        rules, missing = cache.get_many(keys)
+        if missing:
+            index = Sessionization.get_domain_index()
+            for i in missing:
+                d = keys[i]
+                rules[i] = (
+                    index.lookup(d),
+                    any(se in d for se in Sessionization.SEARCH_ENGINES),
+                    Sessionization.sld_category(d),
+                )
+            cache.put_many([keys[i] for i in missing], [rules[i] for i in missing])
+        return rules
+
+    @staticmethod
+    def categorize_batch(urls):
+        """Categorize and normalize a whole column of URLs at once.
+
+        Equivalent to applying categorize_domain_from_url and normalize_domain row by row.
+        Only the distinct URLs are labeled; results are remembered in an LRU cache keyed on
+        the URL (and on the cleaned domain for the domain-level rules) and broadcast back to
+        every row. Caches are dropped automatically when DEFAULT_DOMAIN_MAP or the KW_*
+        patterns change. Returns (categories, domains) object arrays aligned with `urls`.
+        """
+        Sessionization._sync_rules()
+        urls = pd.Series(urls)
+        codes, uniques = pd.factorize(urls)
+        uniques = list(uniques)
+
+        cache = Sessionization._url_cache
+        labels, missing = cache.get_many(uniques)
+        if missing:
+            miss_urls = [uniques[i] for i in missing]
+            store = Sessionization.get_label_store()
+            if store is None:
+                cats, doms = Sessionization._categorize_urls(miss_urls)
+                new_labels = list(zip(cats, doms))
+            else:
+                # Labels from earlier runs first; only URLs never seen (or invalidated) are labeled
+                new_labels = store.get_many(miss_urls)
+                todo = [i for i, label in enumerate(new_labels) if label is None]
+                if todo:
+                    todo_urls = [miss_urls[i] for i in todo]
+                    cats, doms, dom_clean, sources, queries = Sessionization._categorize_urls(todo_urls, details=True)
+                    for i, label in zip(todo, zip(cats, doms)):
+                        new_labels[i] = label
+                    store.put_many(todo_urls, cats, doms, dom_clean, sources, queries, Sessionization._domain_rules)
+            for i, label in zip(missing, new_labels):
+                labels[i] = label
+            cache.put_many(miss_urls, new_labels)
+
+        categories = np.empty(len(uniques) + 1, dtype=object)
+        domains = np.empty(len(uniques) + 1, dtype=object)
+        if labels:
+            categories[:-1], domains[:-1] = zip(*labels)
+        categories = categories[codes]
+        domains = domains[codes]
+
+        # Missing URLs (factorize code -1)
+        for i in np.flatnonzero(codes == -1):
+            categories[i] = "Miscellaneous"
+            domains[i] = Sessionization._normalize_domain_or_none(urls.iat[i])
+        return categories, domains
+
+    @staticmethod
+    def label_url(url):
+        """(category, domain) of a single URL: the URL cache, else the row-wise helpers.
+
+        For per-visit callers such as the online sessionizer, where the vectorized
+        path's fixed cost would dominate. The rules are re-checked first, so edits to
+        DEFAULT_DOMAIN_MAP or the KW_* patterns also reach URLs already in the cache.
+        """
+        Sessionization._sync_rules()
+        cache = Sessionization._url_cache
+        label = cache.get(url)
+        if label is None:
+            label = (Sessionization.categorize_domain_from_url(url), Sessionization._normalize_domain_or_none(url))
+            if isinstance(url, str):
+                cache.put(url, label)
+        return label
+
+    @staticmethod
+    def _categorize_urls(urls, details=False):
+        """Vectorized labeling engine behind categorize_batch (no URL-level caching).
+
+        Each URL is split into netloc/path/query by a single regex and the domain-level
+        rules run once per distinct domain. URLs outside BATCH_URL_PATTERN fall back to
+        the row-wise helpers. With details=True also returns, per URL, the cleaned
+        domain, the rule that decided the category ('map', 'search', 'keyword',
+        'fallback', 'rowwise') and the search query text (for the label store).
+        """
+        urls = pd.Series(urls, dtype=object).reset_index(drop=True)
+        categories = np.full(len(urls), "Miscellaneous", dtype=object)
+        domains = np.full(len(urls), None, dtype=object)
+        dom_cleans = np.full(len(urls), None, dtype=object)
+        sources = np.full(len(urls), "rowwise", dtype=object)
+        query_texts = np.full(len(urls), None, dtype=object)
+
+        def result_tuple():
+            if details:
+                return categories, domains, dom_cleans, sources, query_texts
+            return categories, domains
+
+        parts = urls.str.extract(Sessionization.BATCH_URL_PATTERN)
+        fast = parts["netloc"].notna().to_numpy()
+
+        # Row-wise fallback for missing, non-string and unusual URLs
+        for i in np.flatnonzero(~fast):
+            categories[i] = Sessionization.categorize_domain_from_url(urls.iat[i])
+            domains[i] = Sessionization._normalize_domain_or_none(urls.iat[i])
+        if not fast.any():
+            return result_tuple()
+
+        parts = parts[fast]
+        fast_urls = urls[fast]
+        fast_rows = np.flatnonzero(fast)
+
+        # 1️⃣ normalize_domain: lowercase, strip "www.", drop port
+        dom = parts["netloc"].str.lower()
+        dom = dom.where(~dom.str.startswith("www."), dom.str[4:])
+        dom = dom.str.partition(":")[0]
+        domains[fast_rows] = dom.to_numpy(dtype=object)
+        dom_clean = dom.str.replace(Sessionization.SUBDOMAIN_PREFIX, "", regex=True)
+
+        # 2️⃣ Domain-level rules once per distinct cleaned domain
+        codes, uniques = pd.factorize(dom_clean)
+        rules = Sessionization._domain_rules(uniques)
+        map_cat = np.array([r[0] for r in rules], dtype=object)[codes]
+        is_search = np.array([r[1] for r in rules], dtype=bool)[codes]
+        fallback_cat = np.array([r[2] for r in rules], dtype=object)[codes]
+
+        result = np.empty(len(parts), dtype=object)
+        source = np.full(len(parts), "map", dtype=object)
+        query_text = np.full(len(parts), None, dtype=object)
+        by_map = pd.notna(map_cat)
+        result[by_map] = map_cat[by_map]
+
+        # 3️⃣ Search engines: classify the extracted query text
+        search = ~by_map & is_search
+        if search.any():
+            # regex parts equal urlparse's here, so no re-parse: just the q/query/p/search lookup
+            queries = pd.Series(
+                [Sessionization._search_text(q, p) for q, p in
+                 zip(parts.loc[search, "query"].fillna(""), parts.loc[search, "path"])],
+                index=fast_urls[search].index, dtype=object,
+            )
+            cats = Sessionization.keyword_category_series(queries, "General Search")
+            result[search] = cats
+            source[search] = "search"
+            query_text[search] = queries.to_numpy(dtype=object)
+
+        # 4️⃣ Everything else: domain + path + query tokens, then the domain heuristics
+        rest = ~by_map & ~is_search
+        if rest.any():
+            path_tokens = parts.loc[rest, "path"].str.replace("/", " ", regex=False)
+            query = parts.loc[rest, "query"].fillna("")
+            combined = Sessionization._join_nonempty(
+                Sessionization._join_nonempty(dom_clean[rest], path_tokens), query
+            ).str.lower()
+            cats = Sessionization.keyword_category_series(combined, None)
+            no_kw = pd.isna(cats)
+            cats[no_kw] = fallback_cat[rest][no_kw]
+            result[rest] = cats
+            source[rest] = np.where(no_kw, "fallback", "keyword")
+
+        categories[fast_rows] = result
+        if details:
+            dom_cleans[fast_rows] = dom_clean.to_numpy(dtype=object)
+            sources[fast_rows] = source
+            query_texts[fast_rows] = query_text
+        return result_tuple()
+
     # -----------------------------------------
     # Sessionization Logic
     # -----------------------------------------
+    # Non-proportion columns of the session table; every other column is a category share
+    SESSION_COLUMNS = (
+        'user', 'session_id', 'session_start', 'session_end', 'num_visits', 'unique_domains',
+        'domains_list', 'categories_list', 'observed_span', 'session_duration',
+        'duration_minutes_observed', 'duration_minutes', 'dominant_category',
+    )
+
+    @staticmethod
+    def assign_sessions(df, engine=None, compact=False):
+        """Add the window-start column and session_id to a visits frame.
+
+        The default engine buckets visits into fixed 1-hour windows (session_start_hour);
+        see session_engine for inactivity-gap and sliding-window sessions. With
+        compact=True an int64 session_key is added instead of the session_id strings.
+        """
+        with stage("assign_sessions", rows=len(df)):
+            return (engine or DEFAULT_ENGINE).assign(df, compact=compact)
+
+    @staticmethod
+    def label_visits(df):
+        """Add category and normalized domain for every visit."""
+        with stage("label_visits", rows=len(df)) as s:
+            if s.active:
+                before = Sessionization.cache_stats()
+            df['category'], df['domain'] = Sessionization.categorize_batch(df['url'])
+            if s.active:
+                after = Sessionization.cache_stats()
+                s.set(url_cache_hit_rate=cache_delta(before["url"], after["url"]),
+                      domain_cache_hit_rate=cache_delta(before["domain"], after["domain"]))
+        return df
+
     @staticmethod
-    def sessionization(df):
-        """Group browsing data into 1-hour sessions and aggregate stats."""
-        # 1️⃣ Assign hourly sessions
-        df['session_start_hour'] = df['visit_time'].dt.floor('H')
-        df['session_id'] = df['user'] + "_hour_" + df['session_start_hour'].dt.strftime('%Y%m%d%H')
+    def aggregate_sessions(df, lists=False, engine=None):
+        """Collapse labeled visits into one row per session.
 
-        # 2️⃣ Categorize each URL
-        df['category'] = df['url'].apply(Sessionization.categorize_domain_from_url)
-        df['domain'] = df['url'].apply(Sessionization.normalize_domain)
+        Category counts, the dominant category and the proportions are computed on
+        integer category codes with numpy, without per-session Python calls.
+        `domains_list` / `categories_list` are only built when `lists=True`.
+        Visits keyed by session_key (compact mode) are grouped on the integer key and
+        session_id is formatted once per session.
+        """
+        engine = engine or DEFAULT_ENGINE
+        df = engine.expand(df)
+        compact = 'session_key' in df.columns
 
         # 3️⃣ Aggregate by session
-        session_summary = (
-            df.groupby(['user', 'session_id'])
-            .agg(
-                session_start=('visit_time', 'min'),
-                session_end=('visit_time', 'max'),
-                num_visits=('url', 'count'),
-                unique_domains=('domain', 'nunique'),
+        if compact:
+            df = df[df['session_key'].to_numpy() >= 0]
+            if lists:
+                # per-group lambdas are much slower on categoricals; the lists hold plain strings anyway
+                df = df.assign(domain=df['domain'].astype(object), category=df['category'].astype(object))
+            grouped = df.groupby('session_key', sort=True)
+            aggregations = dict(user=('user', 'first'))
+        else:
+            grouped = df.groupby(['user', 'session_id'], observed=True, sort=True)
+            aggregations = {}
+        aggregations.update(
+            session_start=('visit_time', 'min'),
+            session_end=('visit_time', 'max'),
+            num_visits=('url', 'count'),
+            unique_domains=('domain', 'nunique'),
+        )
+        if lists:
+            aggregations.update(
                 domains_list=('domain', lambda x: list(x.dropna().unique())),
-                categories_list=('category', lambda x: list(x))
+                categories_list=('category', lambda x: list(x)),
             )
-            .reset_index()
-        )
+        with stage("aggregate_groupby", rows=len(df)) as s:
+            session_summary = grouped.agg(**aggregations).reset_index()
+            s.set(sessions=len(session_summary))
+        if compact:
+            keys = session_summary.pop('session_key')
+            session_summary['user'] = session_summary['user'].astype(object)
+            session_summary.insert(1, 'session_id', format_session_keys(session_summary['user'], keys, engine))
 
         # 4️⃣ Compute durations
         session_summary['observed_span'] = session_summary['session_end'] - session_summary['session_start']
-        session_summary['session_duration'] = pd.Timedelta(hours=1)
+        session_summary['session_duration'] = None  # placeholders keep the column order; set by the engine
         session_summary['duration_minutes_observed'] = session_summary['observed_span'].dt.total_seconds() / 60
-        session_summary['duration_minutes'] = 60
+        session_summary['duration_minutes'] = None
+        engine.durations(session_summary)
 
-        # 5️⃣ Dominant category
-        session_summary['dominant_category'] = session_summary['categories_list'].apply(
-            lambda cat_list: Counter(cat_list).most_common(1)[0][0] if cat_list else "Miscellaneous"
-        )
+        if session_summary.empty:
+            session_summary['dominant_category'] = pd.Series(dtype=object)
+            return session_summary
+
+        with stage("aggregate_categories", rows=len(df)):
+            # Session x category count matrix plus the first row of each category in each session
+            session_codes = grouped.ngroup().to_numpy()
+            cat_codes, cat_names = pd.factorize(df['category'])
+            n_sessions, n_cats, n_rows = len(session_summary), len(cat_names), len(df)
+            keys = session_codes * n_cats + cat_codes
+            counts = np.bincount(keys, minlength=n_sessions * n_cats).reshape(n_sessions, n_cats)
+            first_row = np.full(n_sessions * n_cats, n_rows)
+            present_keys, first_idx = np.unique(keys, return_index=True)
+            first_row[present_keys] = first_idx
+            first_row = first_row.reshape(n_sessions, n_cats)
+
+            # 5️⃣ Dominant category: most visits, ties go to the category seen first in the session
+            is_max = counts == counts.max(axis=1, keepdims=True)
+            dominant = np.where(is_max, first_row, n_rows + 1).argmin(axis=1)
+            session_summary['dominant_category'] = np.asarray(cat_names, dtype=object)[dominant]
+
+            # 6️⃣ Category proportions; columns ordered by first appearance (session order, then visit order)
+            props = counts / counts.sum(axis=1, keepdims=True)
+            first_session = (counts > 0).argmax(axis=0)
+            column_order = sorted(range(n_cats), key=lambda k: (first_session[k], first_row[first_session[k], k]))
+            cat_props_df = pd.DataFrame(props[:, column_order], columns=[cat_names[k] for k in column_order])
 
-        # 6️⃣ Category proportions
-        def category_proportions(cat_list):
-            c = Counter(cat_list)
-            total = sum(c.values())
-            if total == 0:
-                return {}
-            return {k: v / total for k, v in c.items()}
+            # 7️⃣ Merge
+            return pd.concat([session_summary, cat_props_df], axis=1)
+
+    @staticmethod
+    def combine_sessions(pieces):
+        """Concatenate session tables built from disjoint sets of sessions."""
+        session_df = pd.concat(pieces, ignore_index=True)
+        prop_cols = [c for c in session_df.columns if c not in Sessionization.SESSION_COLUMNS]
+        session_df[prop_cols] = session_df[prop_cols].fillna(0)
+        return session_df
+
+    @staticmethod
+    def sessionization(df, lists=False, engine=None, compact=False):
+        """Group browsing data into sessions (1-hour windows by default) and aggregate stats.
+
+        Pass lists=True to also get per-session `domains_list` and `categories_list`,
+        and a session_engine instance to change how visits are grouped. With
+        compact=True the visits frame is converted in place to the compact_frame
+        representation (categoricals, Arrow strings, int64 session_key); the session
+        table is the same either way.
+        """
+        with stage("sessionization", rows=len(df)):
+            dictionaries = new_dictionaries()   # scoped to this run
+            if compact:
+                compact_visits(df, dictionaries)
+
+            # 1️⃣ Assign sessions (hourly by default)
+            Sessionization.assign_sessions(df, engine, compact=compact)
+
+            # 2️⃣ Categorize each URL
+            Sessionization.label_visits(df)
+            if compact:
+                compact_visits(df, dictionaries)
+
+            # 3️⃣-7️⃣ Aggregate, durations, dominant category, proportions
+            session_df = Sessionization.aggregate_sessions(df, lists=lists, engine=engine)
+        print("✅ Sessionization complete. Columns:", session_df.columns.tolist())
+        return session_df
+
+    @staticmethod
+    def sessionization_stream(chunks, lists=False, engine=None, stats=None):
+        """Sessionize an iterator of visit chunks (e.g. DataCollection.stream_data()).
 
-        cat_props = session_summary['categories_list'].apply(category_proportions)
-        cat_props_df = pd.json_normalize(cat_props).fillna(0)
+        Chunks must be ordered by user, then visit_time. Each chunk is labeled and
+        aggregated on its own; the trailing session of a chunk is carried over to the
+        next one because it may continue there. Only one chunk of visits is held at a
+        time, plus the (much smaller) session table. When `stats` is given (e.g. a
+        domain_sketches.DomainStats) every labeled visit is passed to stats.update once.
+        """
+        if engine is not None and engine.overlapping:
+            raise ValueError("Streaming sessionization needs non-overlapping sessions.")
+        pieces = []
+        carry = None
+        for chunk in chunks:
+            if carry is not None:
+                chunk = pd.concat([carry, chunk], ignore_index=True)
+            if chunk.empty:
+                continue
+            Sessionization.assign_sessions(chunk, engine)
+            # first row of the trailing session (sessions are contiguous in sorted input)
+            open_from = int(np.argmax(chunk['session_id'].to_numpy() == chunk['session_id'].iat[-1]))
+            carry = chunk.iloc[open_from:].reset_index(drop=True)
+            done = chunk.iloc[:open_from].copy()
+            if len(done):
+                Sessionization.label_visits(done)
+                if stats is not None:
+                    stats.update(done)
+                pieces.append(Sessionization.aggregate_sessions(done, lists=lists, engine=engine))
+        if carry is not None and len(carry):
+            Sessionization.label_visits(carry)
+            if stats is not None:
+                stats.update(carry)
+            pieces.append(Sessionization.aggregate_sessions(carry, lists=lists, engine=engine))
+        if not pieces:
+            return pd.DataFrame(columns=list(Sessionization.SESSION_COLUMNS))
 
-        # 7️⃣ Merge and return
-        session_df = pd.concat([session_summary, cat_props_df], axis=1)
+        session_df = Sessionization.combine_sessions(pieces)
         print("✅ Sessionization complete. Columns:", session_df.columns.tolist())
         return session_df
 
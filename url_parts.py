@@ -0,0 +1,92 @@
+from typing import NamedTuple, Optional
+from urllib.parse import urlparse, unquote
+import numpy as np
+import pandas as pd
+from label_cache import LabelCache
+
+# -----------------------------
+# Shared URL decomposition
+# -----------------------------
+# Every consumer (raw domain column, normalize_domain, the row-wise categorizer and
+# the search-query extractor) reads the same cached parse of a URL instead of
+# calling urlparse / parse_qs itself. Parts only depend on the URL string, so the
+# cache never needs invalidating when the labeling rules change.
+SEARCH_QUERY_KEYS = ("q", "query", "p", "search")   # checked in this order
+URL_PARTS_CACHE_SIZE = 200_000
+
+
+class UrlParts(NamedTuple):
+    netloc: Optional[str]   # urlparse(url).netloc as is (None when urlparse rejects the URL)
+    domain: Optional[str]   # normalized host: lowercase, no "www.", no port ("http://" assumed without a scheme)
+    path: Optional[str]
+    query: Optional[str]
+
+
+_cache = LabelCache(URL_PARTS_CACHE_SIZE)
+
+
+def _normalized_host(parsed):
+    dom = parsed.netloc.lower()
+    if dom.startswith("www."):
+        dom = dom[4:]
+    return dom.split(":")[0]
+
+
+def parse_url(url):
+    """UrlParts of a URL string, parsed once and cached (TypeError for non-strings)."""
+    parts = _cache.get(url)
+    if parts is not None:
+        return parts
+    has_scheme = "://" in url
+    try:
+        parsed = urlparse(url)
+    except ValueError:   # e.g. an unbalanced IPv6 bracket
+        parsed = None
+    try:
+        domain = _normalized_host(parsed if has_scheme and parsed is not None else urlparse(
+            url if has_scheme else "http://" + url
+        ))
+    except ValueError:
+        domain = None
+    if parsed is None:
+        parts = UrlParts(None, domain, None, None)
+    else:
+        parts = UrlParts(parsed.netloc, domain, parsed.path, parsed.query)
+    _cache.put(url, parts)
+    return parts
+
+
+def search_query(query):
+    """Decoded value of the first SEARCH_QUERY_KEYS parameter in a raw query string.
+
+    Same result as looking the keys up in parse_qs(query), without decoding the
+    other parameters: repeated values of the key are joined with spaces, and
+    parameters without "=" or with an empty value are ignored. None when no key
+    has a value.
+    """
+    found = None
+    for field in query.split("&"):
+        name, sep, value = field.partition("=")
+        if not value:
+            continue
+        if "%" in name or "+" in name:
+            name = unquote(name.replace("+", " "))
+        if name in SEARCH_QUERY_KEYS:
+            found = found or {}
+            found.setdefault(name, []).append(unquote(value.replace("+", " ")))
+    if found:
+        for key in SEARCH_QUERY_KEYS:
+            if key in found:
+                return " ".join(found[key])
+    return None
+
+
+def netlocs(urls):
+    """urlparse(str(url)).netloc per URL (None for missing URLs), parsing each distinct URL once."""
+    codes, uniques = pd.factorize(pd.Series(urls))
+    values = [parse_url(str(url)).netloc for url in uniques]
+    return np.array(values + [None], dtype=object)[codes]
+
+
+def cache_stats():
+    return _cache.stats()
@@ -0,0 +1,122 @@
+import os
+import uuid
+import shutil
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+except ImportError:  # optional dependency, only needed for the columnar store
+    pa = None
+    ds = None
+
+# -----------------------------
+# Columnar (Parquet) store for visits and sessions
+# -----------------------------
+
+class VisitStore:
+    """Parquet datasets for raw visits, labeled visits and the session table.
+
+    Every table is hive-partitioned by ``user`` and ``date`` (the day of its time
+    column), timestamps are stored natively, and low-cardinality string columns
+    are dictionary-encoded. Reads push user/date filters down to partition
+    pruning and the time range down to Parquet row-group statistics, and only
+    the requested columns are decoded.
+    """
+
+    TIME_COLUMNS = {
+        "raw_visits": "visit_time",
+        "labeled_visits": "visit_time",
+        "sessions": "session_start",
+    }
+    DICTIONARY_COLUMNS = ("domain", "category", "dominant_category")
+    PARTITIONING = ("user", "date")
+
+    def __init__(self, root):
+        if pa is None:
+            raise ImportError("VisitStore requires pyarrow: pip install pyarrow")
+        self.root = root
+        self._partitioning = ds.partitioning(
+            pa.schema([("user", pa.string()), ("date", pa.string())]), flavor="hive"
+        )
+
+    def path(self, table):
+        if table not in self.TIME_COLUMNS:
+            raise ValueError(f"Unknown table {table!r}; expected one of {sorted(self.TIME_COLUMNS)}.")
+        return os.path.join(self.root, table)
+
+    def exists(self, table):
+        return os.path.isdir(self.path(table))
+
+    def drop_users(self, table, users):
+        """Delete every partition of `table` belonging to `users`."""
+        for user in users:
+            user_dir = os.path.join(self.path(table), f"user={user}")
+            if os.path.isdir(user_dir):
+                shutil.rmtree(user_dir)
+
+    def write(self, table, df, overwrite=False, append=False):
+        """Write `df` into `table`, replacing only the user/date partitions it covers.
+
+        With overwrite=True the whole table is dropped first; with append=True existing
+        files in the touched partitions are kept (used when writing one chunk at a time).
+        """
+        path = self.path(table)
+        if overwrite and os.path.isdir(path):
+            shutil.rmtree(path)
+        time_col = self.TIME_COLUMNS[table]
+        df = df.copy()
+        df["user"] = df["user"].astype(str)
+        df["date"] = df[time_col].dt.strftime("%Y-%m-%d")
+        for col in self.DICTIONARY_COLUMNS:
+            if col in df.columns:
+                df[col] = df[col].astype("category")
+        arrow_table = pa.Table.from_pandas(df, preserve_index=False)
+        ds.write_dataset(
+            arrow_table,
+            path,
+            format="parquet",
+            partitioning=self._partitioning,
+            existing_data_behavior="overwrite_or_ignore" if append else "delete_matching",
+            basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+        )
+
+    def read(self, table, columns=None, users=None, start=None, end=None):
+        """Load `table`, optionally restricted to columns, users and a [start, end) time range."""
+        time_col = self.TIME_COLUMNS[table]
+        dataset = ds.dataset(self.path(table), format="parquet", partitioning=self._partitioning)
+
+        expr = None
+        def add(cond):
+            return cond if expr is None else expr & cond
+        if users is not None:
+            expr = add(ds.field("user").isin([str(u) for u in users]))
+        if start is not None:
+            start = pd.Timestamp(start)
+            expr = add(ds.field("date") >= start.strftime("%Y-%m-%d"))
+            expr = add(ds.field(time_col) >= start.to_datetime64())
+        if end is not None:
+            end = pd.Timestamp(end)
+            expr = add(ds.field("date") <= end.strftime("%Y-%m-%d"))
+            expr = add(ds.field(time_col) < end.to_datetime64())
+
+        if columns is not None:
+            columns = [c for c in columns if c != "date"]
+        df = dataset.to_table(columns=columns, filter=expr).to_pandas()
+        df = df.drop(columns="date", errors="ignore")
+
+        # Partition columns come back last; return the requested order, else the order that was written
+        if columns is not None:
+            df = df[columns]
+        else:
+            meta = dataset.schema.pandas_metadata or {}
+            written = [c["name"] for c in meta.get("columns", []) if c["name"] in df.columns]
+            df = df[written + [c for c in df.columns if c not in written]]
+        for col in df.columns:
+            col_type = dataset.schema.field(col).type
+            if pa.types.is_list(col_type) or pa.types.is_large_list(col_type):
+                df[col] = df[col].map(list)
+        sort_cols = [c for c in ("user", time_col) if c in df.columns]
+        if sort_cols:
+            df = df.sort_values(sort_cols, kind="stable").reset_index(drop=True)
+        return df